@@ -1,181 +1,241 @@
 """
 Main Health & Wellness Planner Agent
 """
-from typing import Dict, Any
-from context import RunContextWrapper
-from tools.goal_analyzer import GoalAnalyzerTool
-from tools.meal_planner import MealPlannerTool
-from tools.workout_recommender import WorkoutRecommenderTool
-from tools.scheduler import CheckinSchedulerTool
-from tools.tracker import ProgressTrackerTool
-from agents.escalation_agent import EscalationAgent
-from agents.nutrition_expert_agent import NutritionExpertAgent
-from agents.injury_support_agent import InjurySupportAgent
+import contextvars
+import time
+from typing import Dict, Any, List, Iterable, Mapping, Tuple
+from context import RunContextWrapper, UserSessionContext
+from hooks import hook_manager
+from utils.message_parser import message_parser, ParsedMessage
+from utils.concurrency import ConcurrencyLimiter, run_sync
+from utils.components import tool_registry, agent_registry
+from utils.tracing import tracer
+from utils.profiler import profiler
 
 class HealthWellnessAgent:
     """Main Health & Wellness Planner Agent"""
     
-    def __init__(self):
+    def __init__(self, max_concurrency: int = 100, tools: Mapping[str, Any] = None,
+                 agents: Mapping[str, Any] = None):
         self.name = "Health & Wellness Planner"
         
-        # Initialize tools
-        self.tools = {
-            'goal_analyzer': GoalAnalyzerTool(),
-            'meal_planner': MealPlannerTool(),
-            'workout_recommender': WorkoutRecommenderTool(),
-            'checkin_scheduler': CheckinSchedulerTool(),
-            'progress_tracker': ProgressTrackerTool()
-        }
+        # Bounds in-flight requests on the async path
+        self.limiter = ConcurrencyLimiter(max_concurrency)
         
-        # Initialize specialized agents
-        self.agents = {
-            'escalation_agent': EscalationAgent(),
-            'nutrition_expert_agent': NutritionExpertAgent(),
-            'injury_support_agent': InjurySupportAgent()
-        }
+        # Tools and specialized agents are imported and built on first use
+        self.tools = tools if tools is not None else tool_registry
+        self.agents = agents if agents is not None else agent_registry
     
     def process_message(self, message: str, context: RunContextWrapper) -> Dict[str, Any]:
         """Process user message and return response"""
+        if tracer.enabled:
+            return self._process_message_instrumented(message, context)
+        
+        # Scan the message once for intent, handoff target and parameters
+        parsed = message_parser.parse(message)
+        return self._handle_locked(parsed, context)
+    
+    def _process_message_instrumented(self, message: str, context: RunContextWrapper) -> Dict[str, Any]:
+        """process_message with tracing spans"""
+        with tracer.span("HealthWellnessAgent.process_message") as span:
+            with tracer.span("MessageParser.parse"):
+                parsed = message_parser.parse(message)
+            span.set(intent=parsed.intent, handoff=parsed.handoff)
+            return self._handle_locked(parsed, context)
+    
+    async def aprocess_message(self, message: str, context: RunContextWrapper) -> Dict[str, Any]:
+        """Process user message without blocking the event loop"""
+        async with self.limiter:
+            with tracer.span("HealthWellnessAgent.aprocess_message") as span:
+                with tracer.span("MessageParser.parse"):
+                    parsed = message_parser.parse(message)
+                
+                # Routing and the handler run on a worker thread
+                span.set(intent=parsed.intent, handoff=parsed.handoff)
+                return await run_sync(self._handle_locked, parsed, context, "agent:HealthWellnessAgent.aprocess_message")
+    
+    def _handle_locked(self, parsed: ParsedMessage, context: RunContextWrapper,
+                       profile_root: str = "agent:HealthWellnessAgent.process_message") -> Dict[str, Any]:
+        """Route and run a parsed message, timing the handler and, for sampled calls, profiling it
         
-        # Determine what the user wants
-        intent = self.get_intent(message)
+        Every path comes through here, so one request per user runs at a time
+        (the user's lock is held throughout) while other users are not blocked.
+        Profiling hooks the current thread, which for aprocess_message is the
+        worker thread running the handler.
+        """
+        with context.get_context().lock, profiler.sample(profile_root) as sample:
+            sample.tag(parsed.handoff or parsed.intent)
+            with tracer.span("HealthWellnessAgent.route"):
+                handler, method, args = self.route(parsed, context)
+            
+            started = time.perf_counter_ns()
+            with tracer.span(f"{type(handler).__name__}.{method}"):
+                response = getattr(handler, method)(*args)
+            self.record_latency(parsed, handler, response, started)
+            return response
+    
+    def record_latency(self, parsed: ParsedMessage, handler: Any, response: Dict[str, Any], started: int):
+        """Record how long a routed handler took, by component, intent and response type"""
+        micros = (time.perf_counter_ns() - started) // 1000
+        component = 'handoff' if parsed.handoff else 'tool'
+        name = 'main_agent' if handler is self else handler.name
+        response_type = response.get('response_type') if isinstance(response, dict) else None
+        hook_manager.record_latency(micros, **{component: name}, intent=parsed.intent, response_type=response_type)
+    
+    def route(self, parsed: ParsedMessage, context: RunContextWrapper) -> Tuple[Any, str, tuple]:
+        """Pick the handler, method name and arguments for a parsed message"""
+        message = parsed.text
         
         # Check for handoff first
-        handoff_agent = self.check_handoff(message)
-        if handoff_agent:
-            return self.handle_handoff(handoff_agent, message, context)
+        if parsed.handoff:
+            return self.route_handoff(parsed.handoff, message, context, parsed)
         
         # Use appropriate tool
+        intent = parsed.intent
         if intent == 'goal':
-            return self.tools['goal_analyzer'].analyze_goal(message, context)
+            return self.tools['goal_analyzer'], 'analyze_goal', (message, context)
         elif intent == 'meal':
-            diet_type = self.extract_diet_type(message)
             goal = context.get_context().goal or {}
-            return self.tools['meal_planner'].generate_meal_plan(diet_type, goal, context)
+            return self.tools['meal_planner'], 'generate_meal_plan', (parsed.diet_type, goal, context, parsed.allergens)
         elif intent == 'workout':
             goal = context.get_context().goal or {}
-            return self.tools['workout_recommender'].recommend_workout(message, goal, context)
+            return self.tools['workout_recommender'], 'recommend_workout', (message, goal, context)
         elif intent == 'progress':
-            progress_data = self.extract_progress_data(message)
-            return self.tools['progress_tracker'].update_progress(progress_data, context)
+            return self.tools['progress_tracker'], 'update_progress', (parsed.progress_data, context)
         elif intent == 'schedule':
-            frequency = self.extract_frequency(message)
-            return self.tools['checkin_scheduler'].schedule_checkin(frequency, context)
+            return self.tools['checkin_scheduler'], 'schedule_checkin', (parsed.frequency, context)
         else:
-            return self.handle_general_conversation(message)
+            return self, 'handle_general_conversation', (message, parsed)
     
-    def get_intent(self, message: str) -> str:
-        """Determine user intent from message"""
-        message_lower = message.lower()
+    def process_batch(self, items: Iterable[Tuple[str, RunContextWrapper]], max_workers: int = None,
+                      executor: str = "thread") -> List[Dict[str, Any]]:
+        """Process many (message, context) pairs on a thread or process pool
         
-        if any(word in message_lower for word in ['goal', 'want to', 'trying to']):
-            return 'goal'
-        elif any(word in message_lower for word in ['meal', 'food', 'diet', 'eat']):
-            return 'meal'
-        elif any(word in message_lower for word in ['workout', 'exercise', 'fitness']):
-            return 'workout'
-        elif any(word in message_lower for word in ['progress', 'update', 'track']):
-            return 'progress'
-        elif any(word in message_lower for word in ['schedule', 'remind', 'checkin']):
-            return 'schedule'
+        Results come back in input order. Messages that share a uid run in order
+        on the same worker so one UserSessionContext is never mutated concurrently.
+        A failing message yields an error response instead of aborting the batch.
+        """
+        items = list(items)
+        results: List[Dict[str, Any]] = [None] * len(items)
+        
+        # Group item indices by user, preserving arrival order inside each group
+        groups: Dict[int, List[int]] = {}
+        for index, (_message, context) in enumerate(items):
+            groups.setdefault(context.get_context().uid, []).append(index)
+        
+        # Pool imports are deferred; multiprocessing is costly to import
+        if executor == "thread":
+            from concurrent.futures import ThreadPoolExecutor
+            pool = ThreadPoolExecutor(max_workers=max_workers)
+        elif executor == "process":
+            from concurrent.futures import ProcessPoolExecutor
+            pool = ProcessPoolExecutor(max_workers=max_workers)
         else:
-            return 'general'
+            raise ValueError(f"Unknown executor: {executor}")
+        
+        with pool:
+            futures = {}
+            for uid, indices in groups.items():
+                if executor == "thread":
+                    # Each group runs in a copy of the caller's context so spans nest under it
+                    batch = [items[i] for i in indices]
+                    futures[uid] = pool.submit(contextvars.copy_context().run, self._process_group, batch)
+                else:
+                    # Contexts travel by value; shared contexts keep their identity in one pickle
+                    batch = [(items[i][0], items[i][1].get_context()) for i in indices]
+                    futures[uid] = pool.submit(_process_group_in_worker, batch)
+            
+            for uid, future in futures.items():
+                indices = groups[uid]
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    for i in indices:
+                        results[i] = self._error_response(e)
+                    continue
+                
+                if executor == "thread":
+                    responses = outcome
+                else:
+                    responses, contexts = outcome
+                    # Copy worker-side mutations back onto the caller's contexts
+                    for i, updated in zip(indices, contexts):
+                        items[i][1].update_context(**dict(updated))
+                
+                for i, response in zip(indices, responses):
+                    results[i] = response
+        
+        return results
+    
+    def _process_group(self, batch: List[Tuple[str, RunContextWrapper]]) -> List[Dict[str, Any]]:
+        """Process one user's messages in order, isolating per-message failures"""
+        responses = []
+        for message, context in batch:
+            try:
+                responses.append(self.process_message(message, context))
+            except Exception as e:
+                responses.append(self._error_response(e))
+        return responses
+    
+    @staticmethod
+    def _error_response(error: Exception) -> Dict[str, Any]:
+        """Build the standard error response"""
+        return {
+            "response_type": "error",
+            "content": {"error": str(error)}
+        }
+    
+    def get_intent(self, message: str) -> str:
+        """Determine user intent from message"""
+        return message_parser.parse(message).intent
     
     def check_handoff(self, message: str) -> str:
         """Check if we need to handoff to specialist"""
-        message_lower = message.lower()
-        
-        if any(word in message_lower for word in ['human', 'coach', 'trainer', 'person']):
-            return 'escalation_agent'
-        elif any(word in message_lower for word in ['diabetes', 'allergy', 'allergic']):
-            return 'nutrition_expert_agent'
-        elif any(word in message_lower for word in ['injury', 'pain', 'hurt']):
-            return 'injury_support_agent'
-        
-        return None
+        return message_parser.parse(message).handoff
     
-    def handle_handoff(self, agent_name: str, message: str, context: RunContextWrapper) -> Dict[str, Any]:
+    def handle_handoff(self, agent_name: str, message: str, context: RunContextWrapper,
+                       parsed: ParsedMessage = None) -> Dict[str, Any]:
         """Handle handoff to specialized agent"""
+        handler, method, args = self.route_handoff(agent_name, message, context, parsed)
+        return getattr(handler, method)(*args)
+    
+    def route_handoff(self, agent_name: str, message: str, context: RunContextWrapper,
+                      parsed: ParsedMessage = None) -> Tuple[Any, str, tuple]:
+        """Pick the specialist agent method and arguments for a handoff"""
         agent = self.agents[agent_name]
+        parsed = parsed or message_parser.parse(message)
         
         if agent_name == 'escalation_agent':
-            return agent.handle_escalation(context, message)
+            return agent, 'handle_escalation', (context, message)
         elif agent_name == 'nutrition_expert_agent':
-            consultation_type = self.extract_nutrition_type(message)
-            return agent.handle_nutrition_consultation(context, consultation_type)
+            return agent, 'handle_nutrition_consultation', (context, parsed.nutrition_type, parsed.allergens)
         elif agent_name == 'injury_support_agent':
-            injury_type = self.extract_injury_type(message)
-            return agent.handle_injury_consultation(context, injury_type)
+            return agent, 'handle_injury_consultation', (context, parsed.injury_type)
     
     def extract_diet_type(self, message: str) -> str:
         """Extract diet type from message"""
-        message_lower = message.lower()
-        
-        if 'vegetarian' in message_lower:
-            return 'vegetarian'
-        elif 'vegan' in message_lower:
-            return 'vegan'
-        elif 'keto' in message_lower:
-            return 'keto'
-        else:
-            return 'omnivore'
+        return message_parser.parse(message).diet_type
     
     def extract_nutrition_type(self, message: str) -> str:
         """Extract nutrition consultation type"""
-        message_lower = message.lower()
-        
-        if 'diabetes' in message_lower:
-            return 'diabetes'
-        elif 'allergy' in message_lower:
-            return 'allergies'
-        else:
-            return 'general'
+        return message_parser.parse(message).nutrition_type
     
     def extract_injury_type(self, message: str) -> str:
         """Extract injury type"""
-        message_lower = message.lower()
-        
-        if 'knee' in message_lower:
-            return 'knee'
-        elif 'back' in message_lower:
-            return 'back'
-        elif 'shoulder' in message_lower:
-            return 'shoulder'
-        else:
-            return 'general'
+        return message_parser.parse(message).injury_type
     
     def extract_progress_data(self, message: str) -> Dict[str, Any]:
         """Extract progress data from message"""
-        import re
-        
-        data = {'notes': message}
-        
-        # Extract weight
-        weight_match = re.search(r'(\d+(?:\.\d+)?)\s*(?:kg|lbs)', message.lower())
-        if weight_match:
-            data['weight'] = weight_match.group(1)
-        
-        # Extract workout count
-        workout_match = re.search(r'(\d+)\s*workout', message.lower())
-        if workout_match:
-            data['workouts_completed'] = workout_match.group(1)
-        
-        return data
+        return message_parser.parse(message).progress_data
     
     def extract_frequency(self, message: str) -> str:
         """Extract frequency from message"""
-        message_lower = message.lower()
-        
-        if 'daily' in message_lower:
-            return 'daily'
-        elif 'weekly' in message_lower:
-            return 'weekly'
-        else:
-            return 'weekly'
+        return message_parser.parse(message).frequency
     
-    def handle_general_conversation(self, message: str) -> Dict[str, Any]:
+    def handle_general_conversation(self, message: str, parsed: ParsedMessage = None) -> Dict[str, Any]:
         """Handle general conversation"""
-        if any(word in message.lower() for word in ['help', 'what can you do']):
+        parsed = parsed or message_parser.parse(message)
+        if parsed.is_help:
             return {
                 'response_type': 'help',
                 'content': {
@@ -202,4 +262,17 @@ class HealthWellnessAgent:
                     "Track my progress"
                 ]
             }
-        }
\ No newline at end of file
+        }
+
+# Agent used by process-pool workers, built once per worker process
+_worker_agent = None
+
+def _process_group_in_worker(batch: List[Tuple[str, UserSessionContext]]) -> Tuple[List[Dict[str, Any]], List[UserSessionContext]]:
+    """Process one user's messages inside a worker process"""
+    global _worker_agent
+    if _worker_agent is None:
+        _worker_agent = HealthWellnessAgent()
+    
+    wrappers = [RunContextWrapper(context) for _message, context in batch]
+    responses = _worker_agent._process_group([(message, wrapper) for (message, _context), wrapper in zip(batch, wrappers)])
+    return responses, [wrapper.get_context() for wrapper in wrappers]
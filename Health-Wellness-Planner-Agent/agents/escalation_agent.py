@@ -3,6 +3,7 @@ Escalation Agent - Handles human coach requests
 """
 from typing import Dict, Any
 from context import RunContextWrapper
+from guardrails import GuardrailValidator
 from hooks import hook_manager
 
 class EscalationAgent:
@@ -21,7 +22,7 @@ class EscalationAgent:
         # Prepare user summary
         user_summary = self.prepare_user_summary(context)
         
-        return {
+        response = {
             "response_type": "escalation",
             "content": {
                 "message": "I'll connect you with a human coach right away!",
@@ -35,6 +36,8 @@ class EscalationAgent:
                 "estimated_wait_time": "24 hours"
             }
         }
+        
+        return GuardrailValidator.validate_output(response)
     
     def prepare_user_summary(self, context: RunContextWrapper) -> Dict[str, Any]:
         """Prepare user summary for coach"""
@@ -3,7 +3,10 @@ Injury Support Agent - Handles physical limitations
 """
 from typing import Dict, Any, List
 from context import RunContextWrapper
+from guardrails import GuardrailValidator
 from hooks import hook_manager
+from utils.components import tool_registry
+from fitness.exercise_library import contraindications
 
 class InjurySupportAgent:
     """Agent for injury support"""
@@ -25,12 +28,12 @@ class InjurySupportAgent:
         recommendations = self.generate_recommendations(injury_type)
         
         # Create modified workout
-        modified_plan = self.create_modified_workout(injury_type)
+        modified_plan = self.create_modified_workout(injury_type, context.get_context().workout_plan)
         
         # Update context
         context.update_context(injury_notes=f"{injury_type}: modified plan created")
         
-        return {
+        response = {
             "response_type": "injury_consultation",
             "content": {
                 "message": "I'll help you stay active safely while you recover.",
@@ -41,6 +44,8 @@ class InjurySupportAgent:
                 "safety_guidelines": self.get_safety_guidelines(injury_type)
             }
         }
+        
+        return GuardrailValidator.validate_output(response)
     
     def analyze_injury(self, injury_type: str) -> Dict[str, Any]:
         """Analyze injury situation"""
@@ -49,7 +54,8 @@ class InjurySupportAgent:
             "severity": "moderate",
             "affected_areas": [],
             "safe_movements": [],
-            "avoid_movements": []
+            "avoid_movements": [],
+            "avoid_patterns": list(contraindications(injury_type))
         }
         
         if injury_type == "knee":
@@ -100,32 +106,15 @@ class InjurySupportAgent:
         
         return base_recommendations
     
-    def create_modified_workout(self, injury_type: str) -> Dict[str, Any]:
-        """Create modified workout plan"""
-        if injury_type == "knee":
-            return {
-                "weekly_plan": [
-                    {"day": "Monday", "focus": "Upper Body", "exercises": ["Seated Shoulder Press", "Chest Press", "Seated Row"], "notes": "All seated exercises"},
-                    {"day": "Wednesday", "focus": "Core", "exercises": ["Seated Core Twists", "Upper Body Stretches"], "notes": "Gentle movements only"},
-                    {"day": "Friday", "focus": "Swimming", "exercises": ["Swimming", "Water Walking"], "notes": "Low-impact cardio"}
-                ]
-            }
-        elif injury_type == "back":
-            return {
-                "weekly_plan": [
-                    {"day": "Monday", "focus": "Gentle Movement", "exercises": ["Walking", "Gentle Stretches"], "notes": "Keep spine neutral"},
-                    {"day": "Wednesday", "focus": "Core Stability", "exercises": ["Dead Bug", "Bird Dog"], "notes": "Focus on form"},
-                    {"day": "Friday", "focus": "Lower Body", "exercises": ["Wall Squats", "Calf Raises"], "notes": "Avoid bending forward"}
-                ]
-            }
-        else:
-            return {
-                "weekly_plan": [
-                    {"day": "Monday", "focus": "Lower Body", "exercises": ["Squats", "Lunges"], "notes": "Avoid using injured area"},
-                    {"day": "Wednesday", "focus": "Cardio", "exercises": ["Walking", "Stationary Bike"], "notes": "Low impact only"},
-                    {"day": "Friday", "focus": "Flexibility", "exercises": ["Gentle Stretching"], "notes": "Pain-free range only"}
-                ]
-            }
+    def create_modified_workout(self, injury_type: str, workout_plan: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Adapt the user's workout plan (a beginner strength plan if none) around the injury"""
+        workout_plan = workout_plan or {}
+        prefs = {
+            "workout_type": workout_plan.get("workout_type", "strength"),
+            "experience_level": workout_plan.get("experience_level", "beginner")
+        }
+        plan = tool_registry['workout_recommender'].create_workout_plan(prefs, {}, contraindications(injury_type))
+        return {"weekly_plan": plan["weekly_plan"]}
     
     def get_safety_guidelines(self, injury_type: str) -> List[str]:
         """Get safety guidelines"""
@@ -1,9 +1,13 @@
 """
 Nutrition Expert Agent - Handles complex dietary needs
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Sequence
 from context import RunContextWrapper
+from guardrails import GuardrailValidator
 from hooks import hook_manager
+from nutrition.glycemic import analyse_plan
+from utils.components import tool_registry
+from utils.template_registry import template_registry
 
 class NutritionExpertAgent:
     """Agent for nutrition expertise"""
@@ -11,7 +15,8 @@ class NutritionExpertAgent:
     def __init__(self):
         self.name = "nutrition_expert_agent"
     
-    def handle_nutrition_consultation(self, context: RunContextWrapper, consultation_type: str = "general") -> Dict[str, Any]:
+    def handle_nutrition_consultation(self, context: RunContextWrapper, consultation_type: str = "general",
+                                      allergens: Sequence[str] = ()) -> Dict[str, Any]:
         """Handle nutrition consultation"""
         hook_manager.log_handoff("main_agent", self.name)
         
@@ -21,58 +26,75 @@ class NutritionExpertAgent:
         # Generate recommendations
         recommendations = self.generate_recommendations(consultation_type)
         
-        return {
+        content = {
+            "message": "I'm here to help with your specialized nutrition needs.",
+            "consultation_type": consultation_type,
+            "recommendations": recommendations,
+            "important_notes": self.get_important_notes(consultation_type),
+            "resources": self.get_resources(consultation_type)
+        }
+        
+        # Diabetes flags the user and scores their current plan's glycemic load
+        if consultation_type == "diabetes":
+            glycemic_analysis = self.analyse_glycemic_load(context)
+            if glycemic_analysis is not None:
+                content["glycemic_analysis"] = glycemic_analysis
+                content["message"] = self.describe_glycemic_load(glycemic_analysis)
+        
+        # Named allergens replace the plan with one that avoids them
+        if allergens:
+            meal_plan = self.regenerate_safe_plan(context, allergens)
+            content["allergies"] = meal_plan["excluded_allergens"]
+            content["meal_plan"] = meal_plan
+            content["message"] = f"I've rebuilt your meal plan without {', '.join(meal_plan['excluded_allergens'])}."
+        
+        response = {
             "response_type": "nutrition_consultation",
-            "content": {
-                "message": "I'm here to help with your specialized nutrition needs.",
-                "consultation_type": consultation_type,
-                "recommendations": recommendations,
-                "important_notes": self.get_important_notes(consultation_type),
-                "resources": self.get_resources(consultation_type)
-            }
+            "content": content
         }
+        
+        return GuardrailValidator.validate_output(response)
+    
+    def analyse_glycemic_load(self, context: RunContextWrapper) -> Optional[Dict[str, Any]]:
+        """Flag the user as diabetic and analyse their current meal plan, if they have one"""
+        user_context = context.get_context()
+        conditions = list(user_context.health_conditions or ())
+        if "diabetes" not in conditions:
+            context.update_context(health_conditions=conditions + ["diabetes"])
+        
+        if not user_context.meal_plan:
+            return None
+        return analyse_plan(user_context.meal_plan, user_context.diet_preferences or "omnivore",
+                            user_context.allergies or ())
+    
+    def describe_glycemic_load(self, analysis: Dict[str, Any]) -> str:
+        """One-line summary of a glycemic load analysis"""
+        over = analysis["days_over_target"]
+        if not over:
+            return (f"Your meal plan averages a daily glycemic load of {analysis['weekly_average']}, "
+                    f"within the target of {analysis['target']:g}.")
+        return (f"Your meal plan averages a daily glycemic load of {analysis['weekly_average']}; "
+                f"{len(over)} day(s) exceed {analysis['target']:g}, so I've suggested "
+                f"{len(analysis['swaps'])} lower-load swaps.")
+    
+    def regenerate_safe_plan(self, context: RunContextWrapper, allergens: Sequence[str]) -> Dict[str, Any]:
+        """Record the allergies and rebuild the meal plan from recipes free of all of them"""
+        user_context = context.get_context()
+        allergies = GuardrailValidator.validate_allergens(list(user_context.allergies or ()) + list(allergens))
+        diet_type = user_context.diet_preferences or "omnivore"
+        goal = user_context.goal or {}
+        
+        meal_planner = tool_registry['meal_planner']
+        calories = meal_planner.estimate_calories(goal, user_context)
+        meal_plan = meal_planner.create_meal_plan(diet_type, goal, allergies, calories)
+        context.update_context(allergies=allergies, calorie_target=calories, meal_plan=meal_plan["daily_plans"])
+        user_context.add_progress_log("meal_planning", f"Regenerated {diet_type} meal plan without {', '.join(allergies)}")
+        return meal_plan
     
     def generate_recommendations(self, consultation_type: str) -> List[Dict[str, Any]]:
         """Generate nutrition recommendations"""
-        if consultation_type == "diabetes":
-            return [
-                {
-                    "category": "carbohydrate_management",
-                    "priority": "high",
-                    "recommendation": "Focus on complex carbohydrates and monitor portions",
-                    "reason": "Helps maintain stable blood glucose"
-                },
-                {
-                    "category": "fiber_intake",
-                    "priority": "high",
-                    "recommendation": "Include 25-35g fiber daily",
-                    "reason": "Slows glucose absorption"
-                }
-            ]
-        elif consultation_type == "allergies":
-            return [
-                {
-                    "category": "allergen_avoidance",
-                    "priority": "high",
-                    "recommendation": "Read all food labels carefully",
-                    "reason": "Prevent allergic reactions"
-                },
-                {
-                    "category": "nutrient_replacement",
-                    "priority": "medium",
-                    "recommendation": "Find alternative nutrient sources",
-                    "reason": "Maintain nutritional adequacy"
-                }
-            ]
-        else:
-            return [
-                {
-                    "category": "general_nutrition",
-                    "priority": "medium",
-                    "recommendation": "Eat a balanced diet with variety",
-                    "reason": "Ensures adequate nutrition"
-                }
-            ]
+        recommendations = template_registry.get("nutrition_recommendations")
+        return recommendations.get(consultation_type, recommendations["general"])
     
     def get_important_notes(self, consultation_type: str) -> List[str]:
         """Get important notes"""
@@ -1,9 +1,13 @@
 """
 Context Management for Health & Wellness Planner Agent
 """
-from typing import Optional, List, Dict, Any
-from pydantic import BaseModel
+from typing import Optional, Dict, Any, Sequence
+from pydantic import BaseModel, Field
 from datetime import datetime
+from utils.session_log import SessionLog, session_log_path
+from utils.metric_store import ProgressMetricStore
+from utils.locks import session_locks
+from utils.tracing import traced
 
 class UserSessionContext(BaseModel):
     """User session context"""
@@ -11,29 +15,72 @@ class UserSessionContext(BaseModel):
     uid: int = 0
     goal: Optional[Dict[str, Any]] = None
     diet_preferences: Optional[str] = None
+    allergies: Optional[Sequence[str]] = None
+    health_conditions: Optional[Sequence[str]] = None
     workout_plan: Optional[Dict[str, Any]] = None
-    meal_plan: Optional[List[str]] = None
+    meal_plan: Optional[Sequence[Dict[str, Any]]] = None
     injury_notes: Optional[str] = None
-    handoff_logs: List[str] = []
-    progress_logs: List[Dict[str, str]] = []
+    age: Optional[int] = None
+    sex: Optional[str] = None
+    height_cm: Optional[float] = None
+    weight_kg: Optional[float] = None
+    activity_level: Optional[str] = None
+    calorie_target: Optional[int] = None
+    handoff_logs: SessionLog = Field(default_factory=SessionLog)
+    progress_logs: SessionLog = Field(default_factory=SessionLog)
+    progress_metrics: ProgressMetricStore = Field(default_factory=ProgressMetricStore)
     
+    def model_post_init(self, __context: Any):
+        """Point the session logs at this user's segment files"""
+        self.bind_logs()
+    
+    def bind_logs(self):
+        """Bind the session logs to the segment files for the current uid"""
+        self.handoff_logs.bind(session_log_path(self.uid, "handoff"))
+        self.progress_logs.bind(session_log_path(self.uid, "progress"))
+    
+    def clear_logs(self):
+        """Drop both session logs and their segment files once the session is gone"""
+        with self.lock:
+            self.handoff_logs.clear()
+            self.progress_logs.clear()
+    
+    @property
+    def lock(self):
+        """Striped lock guarding this user's state"""
+        return session_locks.for_key(self.uid)
+    
+    @traced()
     def update_context(self, **kwargs):
-        """Update context with new values"""
-        for key, value in kwargs.items():
-            if hasattr(self, key):
-                setattr(self, key, value)
+        """Update context with new values as one atomic step"""
+        with self.lock:
+            for key, value in kwargs.items():
+                if hasattr(self, key):
+                    if key in ("handoff_logs", "progress_logs"):
+                        value = SessionLog.from_value(value)
+                    elif key == "progress_metrics":
+                        value = ProgressMetricStore.from_value(value)
+                    setattr(self, key, value)
+            if "uid" in kwargs:
+                self.bind_logs()
     
+    @traced()
     def add_progress_log(self, log_type: str, message: str):
         """Add progress log"""
-        self.progress_logs.append({
+        entry = {
             "timestamp": datetime.now().isoformat(),
             "type": log_type,
             "message": message
-        })
+        }
+        with self.lock:
+            self.progress_logs.append(entry)
     
+    @traced()
     def add_handoff_log(self, message: str):
         """Add handoff log"""
-        self.handoff_logs.append(f"{datetime.now().isoformat()}: {message}")
+        entry = f"{datetime.now().isoformat()}: {message}"
+        with self.lock:
+            self.handoff_logs.append(entry)
 
 class RunContextWrapper:
     """Context wrapper"""
@@ -0,0 +1,230 @@
+"""
+Exercise library held as NumPy bitmask columns, with injury contraindications
+"""
+import csv
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_LIBRARY_PATH = os.path.join(PROJECT_ROOT, "data", "exercises.csv")
+
+# One bit per muscle group an exercise trains; cardio stands for heart and lungs
+MUSCLE_GROUPS = ("chest", "back", "shoulders", "arms", "core", "legs", "glutes", "cardio")
+MUSCLE_BITS = {group: 1 << bit for bit, group in enumerate(MUSCLE_GROUPS)}
+
+# One bit per piece of equipment an exercise needs; bodyweight means none
+EQUIPMENT = ("bodyweight", "dumbbell", "barbell", "machine", "cable", "band", "bench", "pull_up_bar", "bike", "pool")
+EQUIPMENT_BITS = {item: 1 << bit for bit, item in enumerate(EQUIPMENT)}
+
+# One bit per movement pattern, including the joint stresses an injury rules out
+MOVEMENT_PATTERNS = (
+    "squat", "lunge", "hinge", "horizontal_push", "vertical_push", "horizontal_pull", "vertical_pull",
+    "rotation", "isometric", "locomotion", "stretch", "isolation",
+    "deep_knee_flexion", "impact", "spinal_loading", "spinal_flexion", "overhead",
+    "shoulder_abduction", "shoulder_loading"
+)
+PATTERN_BITS = {pattern: 1 << bit for bit, pattern in enumerate(MOVEMENT_PATTERNS)}
+
+# Movement patterns each injury rules out; injuries not listed here fall back to "general"
+INJURY_CONTRAINDICATIONS = {
+    "knee": ("deep_knee_flexion", "lunge", "impact"),
+    "back": ("spinal_loading", "spinal_flexion", "rotation"),
+    "shoulder": ("overhead", "vertical_push", "horizontal_push", "vertical_pull",
+                 "shoulder_abduction", "shoulder_loading"),
+    "general": ("impact",)
+}
+
+def tag_mask(tags: Iterable[str], bits: Dict[str, int], kind: str) -> int:
+    """Bitmask for a list of tags"""
+    mask = 0
+    for tag in tags:
+        tag = tag.strip().lower()
+        if not tag:
+            continue
+        if tag not in bits:
+            raise ValueError(f"Unknown exercise {kind}: {tag}")
+        mask |= bits[tag]
+    return mask
+
+def contraindications(injury_notes: str) -> Tuple[str, ...]:
+    """Movement patterns ruled out by free-text injury notes, in MOVEMENT_PATTERNS order"""
+    if not injury_notes:
+        return ()
+    words = set(re.findall(r"[a-z]+", injury_notes.lower()))
+    injuries = [injury for injury in INJURY_CONTRAINDICATIONS if injury in words] or ["general"]
+    avoided = {pattern for injury in injuries for pattern in INJURY_CONTRAINDICATIONS[injury]}
+    return tuple(pattern for pattern in MOVEMENT_PATTERNS if pattern in avoided)
+
+class ExerciseLibrary:
+    """Exercises as parallel arrays: one row per exercise
+
+    Columns: muscles (uint16 bitmask of MUSCLE_GROUPS), primary (the bit of
+    the first muscle group listed), equipment (uint16 bitmask of EQUIPMENT)
+    and patterns (uint32 bitmask of MOVEMENT_PATTERNS).
+    A lookup such as "legs, no deep knee flexion, bodyweight only" is one
+    vectorised pass of ANDs over the three columns.
+    """
+
+    def __init__(self, names: List[str], columns: Dict[str, Any]):
+        self.names = names
+        self.muscles = columns["muscles"]
+        self.primary = columns["primary"]
+        self.equipment = columns["equipment"]
+        self.patterns = columns["patterns"]
+        # Muscle bits unpacked to 0/1 columns, for counting shared groups with a matrix product
+        self.muscle_matrix = ((self.muscles[:, None] >> np.arange(len(MUSCLE_GROUPS))) & 1).astype(np.int8)
+        self._rows_by_name = {name.lower(): row for row, name in enumerate(names)}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def from_csv(cls, path: str) -> "ExerciseLibrary":
+        """Load a library CSV (name,muscles,equipment,patterns; tags ';'-separated)
+
+        Every exercise needs at least one movement pattern, so none slips past
+        the contraindication filter untagged.
+        """
+        names, muscles, primary, equipment, patterns = [], [], [], [], []
+        with open(path, newline="", encoding="utf-8") as handle:
+            for row in csv.DictReader(handle):
+                names.append(row["name"])
+                muscles.append(tag_mask(row["muscles"].split(";"), MUSCLE_BITS, "muscle group"))
+                primary.append(tag_mask(row["muscles"].split(";")[:1], MUSCLE_BITS, "muscle group"))
+                equipment.append(tag_mask(row["equipment"].split(";"), EQUIPMENT_BITS, "equipment"))
+                patterns.append(tag_mask((row.get("patterns") or "").split(";"), PATTERN_BITS, "movement pattern"))
+                if not patterns[-1]:
+                    raise ValueError(f"Exercise has no movement pattern: {row['name']}")
+
+        columns = {
+            "muscles": np.array(muscles, dtype=np.uint16),
+            "primary": np.array(primary, dtype=np.uint16),
+            "equipment": np.array(equipment, dtype=np.uint16),
+            "patterns": np.array(patterns, dtype=np.uint32)
+        }
+        return cls(names, columns)
+
+    def row(self, name: str) -> int:
+        """Row of an exercise by name (case-insensitive), -1 when not in the library"""
+        return self._rows_by_name.get(name.lower(), -1)
+
+    def mask(self, muscles: Sequence[str] = (), avoid: Sequence[str] = (), equipment: Sequence[str] = None) -> Any:
+        """Boolean mask of exercises training any of `muscles`, with none of the `avoid` patterns,
+        needing nothing beyond `equipment` (None allows any)"""
+        keep = (self.patterns & tag_mask(avoid, PATTERN_BITS, "movement pattern")) == 0
+        if muscles:
+            keep &= (self.muscles & tag_mask(muscles, MUSCLE_BITS, "muscle group")) != 0
+        if equipment is not None:
+            allowed = tag_mask(equipment, EQUIPMENT_BITS, "equipment") | EQUIPMENT_BITS["bodyweight"]
+            keep &= (self.equipment & ~np.uint16(allowed)) == 0
+        return keep
+
+    def query(self, muscles: Sequence[str] = (), avoid: Sequence[str] = (), equipment: Sequence[str] = None) -> Any:
+        """Rows of the exercises matching mask()"""
+        return np.flatnonzero(self.mask(muscles, avoid, equipment))
+
+    def equipment_tags(self, row: int) -> List[str]:
+        """Equipment an exercise needs, as EQUIPMENT tags"""
+        return [item for item in EQUIPMENT if int(self.equipment[row]) & EQUIPMENT_BITS[item]]
+
+    def is_safe(self, row: int, avoid: Sequence[str]) -> bool:
+        """Whether an exercise has none of the `avoid` patterns"""
+        return not int(self.patterns[row]) & tag_mask(avoid, PATTERN_BITS, "movement pattern")
+
+    def alternatives(self, row: int, avoid: Sequence[str] = (), equipment: Sequence[str] = None,
+                     exclude: Sequence[int] = (), limit: int = None) -> List[int]:
+        """Safe alternatives to an exercise, closest first
+
+        Candidates avoid the patterns, fit the equipment, share a muscle group
+        and are the same kind of work (strength, cardio or stretching). Each
+        shared muscle group scores three, each group trained at all costs one
+        and the same equipment adds one; ties go to library order.
+        """
+        keep = self.mask(avoid=avoid, equipment=equipment)
+        keep &= (self.muscles & MUSCLE_BITS["cardio"]) == (self.muscles[row] & MUSCLE_BITS["cardio"])
+        keep &= (self.patterns & PATTERN_BITS["stretch"]) == (self.patterns[row] & PATTERN_BITS["stretch"])
+        keep &= (self.muscles & self.muscles[row]) != 0
+        keep[list(exclude)] = False
+        keep[row] = False
+        candidates = np.flatnonzero(keep)
+        trained = self.muscle_matrix[candidates].sum(axis=1, dtype=np.int32)
+        shared = self.muscle_matrix[candidates] @ self.muscle_matrix[row].astype(np.int32)
+        score = 3 * shared - trained + (self.equipment[candidates] == self.equipment[row])
+        order = np.argsort(-score, kind="stable")[:limit]
+        return candidates[order].tolist()
+
+    def substitute(self, row: int, avoid: Sequence[str], equipment: Sequence[str] = None,
+                   exclude: Sequence[int] = ()) -> int:
+        """Closest safe alternative to an exercise, -1 when there is none"""
+        closest = self.alternatives(row, avoid, equipment, exclude, limit=1)
+        return closest[0] if closest else -1
+
+    def _safe_name(self, name: str, avoid: Sequence[str], equipment: Sequence[str], taken: set,
+                   notes: List[str]) -> str:
+        """The exercise itself when safe (or unknown), else its closest substitute; None when dropped"""
+        row = self.row(name)
+        if row < 0 or self.is_safe(row, avoid):
+            return name
+        replacement = self.substitute(row, avoid, equipment, exclude=list(taken))
+        if replacement < 0:
+            notes.append(f"Dropped {name}")
+            return None
+        taken.add(replacement)
+        notes.append(f"Swapped {name} for {self.names[replacement]}")
+        return self.names[replacement]
+
+    def adapt_plan(self, weekly_plan: Sequence[Dict[str, Any]], avoid: Sequence[str],
+                   equipment: Sequence[str] = None) -> List[Dict[str, Any]]:
+        """Weekly plan with every exercise or activity that hits an `avoid` pattern swapped or dropped
+
+        Names the library does not know are kept as they are. Swaps are noted
+        on the day; a day left with nothing to do is dropped.
+        """
+        if not avoid:
+            return [dict(day) for day in weekly_plan]
+
+        adapted = []
+        for day in weekly_plan:
+            day = dict(day)
+            exercises = list(day.get("exercises") or ())
+            activity = day.get("activity")
+            taken = {self.row(name) for name in exercises + ([activity] if activity else [])} - {-1}
+            notes: List[str] = []
+
+            kept = []
+            for name in exercises:
+                safe_name = self._safe_name(name, avoid, equipment, taken, notes)
+                if safe_name:
+                    kept.append(safe_name)
+            if activity:
+                activity = self._safe_name(activity, avoid, equipment, taken, notes)
+
+            if not kept and not activity:
+                continue
+            if "exercises" in day:
+                day["exercises"] = kept
+            if "activity" in day:
+                if activity:
+                    day["activity"] = activity
+                else:
+                    del day["activity"]
+            if notes:
+                day["notes"] = "; ".join(([day["notes"]] if day.get("notes") else []) + notes)
+            adapted.append(day)
+        return adapted
+
+# Global library, loaded on first use
+_library = None
+_library_lock = threading.Lock()
+
+def get_library() -> ExerciseLibrary:
+    """Get the process-wide exercise library (EXERCISE_LIBRARY or data/exercises.csv)"""
+    global _library
+    if _library is None:
+        with _library_lock:
+            if _library is None:
+                _library = ExerciseLibrary.from_csv(os.getenv("EXERCISE_LIBRARY", DEFAULT_LIBRARY_PATH))
+    return _library
@@ -0,0 +1,178 @@
+"""
+Multi-week periodised programmes, generated lazily one week at a time
+"""
+import random
+import re
+from itertools import islice
+from typing import Any, Dict, Iterator, List, NamedTuple, Sequence, Tuple
+import numpy as np
+from fitness.exercise_library import PATTERN_BITS, get_library
+
+MIN_WEEKS = 4
+MAX_WEEKS = 52
+DEFAULT_WEEKS = 12
+
+# Each block is three loading weeks followed by a deload week
+BLOCK_WEEKS = 4
+
+class Progression(NamedTuple):
+    """Strength prescription for one experience level"""
+    sets: int
+    reps: Tuple[int, int, int]
+    week_gain: float
+    block_gain: float
+
+# Reps drop and load (% of starting working weight) climbs through each block;
+# every new block starts a little heavier than the one before
+STRENGTH_PROGRESSIONS = {
+    "beginner": Progression(3, (12, 10, 8), 5.0, 5.0),
+    "intermediate": Progression(4, (10, 8, 6), 4.0, 4.0),
+    "advanced": Progression(5, (8, 6, 4), 2.5, 2.5)
+}
+
+# Cardio sessions grow by this share of their starting length per loading week, up to a cap
+DURATION_STEP = {"beginner": 0.10, "intermediate": 0.07, "advanced": 0.05}
+MAX_DURATION_MULTIPLE = 2.0
+
+# Deload weeks: fewer sets at a lighter load, shorter cardio
+DELOAD_SET_SHARE = 0.6
+DELOAD_LOAD_SHARE = 0.85
+DELOAD_DURATION_SHARE = 0.7
+
+# From the second block on, each exercise may rotate to one of its closest alternatives
+ROTATION_CHOICES = 3
+
+# Movements a variation must share; the joint-stress patterns after them don't count
+MOVEMENTS = ("squat", "lunge", "hinge", "horizontal_push", "vertical_push", "horizontal_pull",
+             "vertical_pull", "rotation", "isometric", "locomotion", "stretch", "isolation")
+MOVEMENT_MASK = sum(PATTERN_BITS[movement] for movement in MOVEMENTS)
+
+class Programme(NamedTuple):
+    """Compact programme descriptor kept in the user's context; weeks are rebuilt from it"""
+    workout_type: str
+    experience_level: str
+    weeks: int
+    seed: int
+    current_week: int = 1
+
+    @classmethod
+    def from_value(cls, value: Any) -> "Programme":
+        """Rebuild a descriptor stored as a dict (e.g. after a session round-trip)"""
+        if isinstance(value, cls):
+            return value
+        return cls(**{field: value[field] for field in cls._fields if field in value})
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict for the context and responses"""
+        return dict(self._asdict())
+
+def new_programme(workout_type: str, experience_level: str, weeks: int = DEFAULT_WEEKS,
+                  seed: int = None) -> Programme:
+    """Descriptor for a programme of MIN_WEEKS..MAX_WEEKS weeks, seeded at random unless given"""
+    weeks = min(max(int(weeks), MIN_WEEKS), MAX_WEEKS)
+    if seed is None:
+        seed = random.randrange(2 ** 31)
+    return Programme(workout_type, experience_level, weeks, seed)
+
+def week_phase(week: int) -> Tuple[int, int, bool]:
+    """(block index, position in block, deload) of a 1-based week"""
+    block, position = divmod(week - 1, BLOCK_WEEKS)
+    return block, position, position == BLOCK_WEEKS - 1
+
+def _minutes(duration: str) -> int:
+    match = re.search(r"\d+", duration or "")
+    return int(match.group()) if match else 30
+
+def _rotation(programme: Programme, base_week: Sequence[Dict[str, Any]], block: int,
+              avoid: Sequence[str]) -> List[List[str]]:
+    """Exercise names per day for a block; the first block keeps the base week's choices
+
+    A rotated exercise is never one already in the week, so lifts don't repeat
+    across days unless the base week repeats them, and needs no equipment the
+    base week doesn't already use.
+    """
+    names = [list(day.get("exercises") or ()) for day in base_week]
+    if block == 0:
+        return names
+
+    library = get_library()
+    rng = np.random.default_rng([programme.seed, block])
+    taken = {library.row(name) for day_names in names for name in day_names} - {-1}
+    equipment = sorted({item for row in taken for item in library.equipment_tags(row)})
+    rotated = []
+    for day_names in names:
+        day_rotation = []
+        for name in day_names:
+            row = library.row(name)
+            if row < 0:
+                day_rotation.append(name)
+                continue
+            # Variations share the primary muscle and a movement
+            variations = [
+                alternative for alternative in library.alternatives(row, avoid, equipment, exclude=list(taken))
+                if library.primary[alternative] == library.primary[row]
+                and int(library.patterns[alternative] & library.patterns[row]) & MOVEMENT_MASK
+            ]
+            options = [row] + variations[:ROTATION_CHOICES - 1]
+            choice = options[int(rng.integers(len(options)))]
+            taken.add(choice)
+            day_rotation.append(library.names[choice])
+        rotated.append(day_rotation)
+    return rotated
+
+def iter_weeks(programme: Programme, base_week: Sequence[Dict[str, Any]], start: int = None,
+               stop: int = None, avoid: Sequence[str] = ()) -> Iterator[Dict[str, Any]]:
+    """Yield weeks start..stop (1-based, inclusive; default current week to the end) on demand
+
+    Strength days get sets, reps and a load as a percentage of the starting
+    working weight; cardio days get a longer session each loading week. The
+    base week is the (injury-adapted) single-week plan, and `avoid` keeps
+    rotated exercises clear of the same movement patterns.
+    """
+    start = max(start or programme.current_week, 1)
+    stop = min(stop or programme.weeks, programme.weeks)
+    progression = STRENGTH_PROGRESSIONS.get(programme.experience_level, STRENGTH_PROGRESSIONS["beginner"])
+    duration_step = DURATION_STEP.get(programme.experience_level, DURATION_STEP["beginner"])
+    rotations: Dict[int, List[List[str]]] = {}
+
+    for week in range(start, stop + 1):
+        block, position, deload = week_phase(week)
+        if block not in rotations:
+            rotations = {block: _rotation(programme, base_week, block, avoid)}
+        # Loading weeks so far, counting the deload as a repeat of the block's start
+        build_step = min(position, BLOCK_WEEKS - 2)
+        loading_weeks = block * (BLOCK_WEEKS - 1) + (0 if deload else build_step)
+
+        days = []
+        for base_day, names in zip(base_week, rotations[block]):
+            day = {key: value for key, value in base_day.items() if key not in ("exercises", "notes")}
+            if names:
+                load = 100.0 + progression.block_gain * block + progression.week_gain * (0 if deload else build_step)
+                sets = progression.sets + (build_step == BLOCK_WEEKS - 2)
+                reps = progression.reps[0 if deload else build_step]
+                if deload:
+                    load *= DELOAD_LOAD_SHARE
+                    sets = max(2, round(progression.sets * DELOAD_SET_SHARE))
+                day["exercises"] = names
+                day["prescriptions"] = [
+                    {"exercise": name, "sets": sets, "reps": reps, "load_pct": round(load)} for name in names
+                ]
+            elif "activity" in base_day:
+                growth = min(1.0 + duration_step * loading_weeks, MAX_DURATION_MULTIPLE)
+                if deload:
+                    growth *= DELOAD_DURATION_SHARE
+                minutes = _minutes(base_day.get("duration")) * growth
+                day["duration"] = f"{int(round(minutes / 5) * 5)} minutes"
+            days.append(day)
+
+        yield {
+            "week": week,
+            "block": block + 1,
+            "phase": "deload" if deload else "build",
+            "days": days
+        }
+
+def materialise(programme: Programme, base_week: Sequence[Dict[str, Any]], start: int = None,
+                count: int = 1, avoid: Sequence[str] = ()) -> List[Dict[str, Any]]:
+    """The next `count` weeks from `start` (default: the current week) as a list"""
+    return list(islice(iter_weeks(programme, base_week, start, avoid=avoid), count))
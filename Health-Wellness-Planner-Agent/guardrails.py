@@ -2,51 +2,180 @@
 Input and Output Guardrails
 """
 import re
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, Iterable, List, NamedTuple, Optional, Tuple
+from utils.tracing import traced
+from response_schemas import response_schemas
+
+# Conversion factors to the normalised units
+KG_PER_UNIT = {'kg': 1.0, 'kgs': 1.0, 'kilo': 1.0, 'kilos': 1.0, 'kilogram': 1.0, 'kilograms': 1.0,
+               'lb': 0.45359237, 'lbs': 0.45359237, 'pound': 0.45359237, 'pounds': 0.45359237}
+DAYS_PER_UNIT = {'day': 1, 'week': 7, 'month': 30}
+
+# Category order for the uint8 codes returned by the batch validators
+METRIC_CODES = ("", "kg", "lbs", "pounds")
+GOAL_TYPE_CODES = ("fitness", "weight_loss", "weight_gain")
+# Checked in this order; the first diet found in the text wins
+ALLOWED_DIETS = ('vegetarian', 'vegan', 'keto', 'paleo', 'omnivore')
+
+# One scan finds every goal field: each alternative is a lookahead, so all
+# positions are tried without consuming text and the first hit of each field wins
+GOAL_PATTERN = re.compile(
+    r'(?=(?P<mass>(?P<mass_amount>\d+(?:\.\d+)?)\s*(?P<mass_unit>kilograms?|kilos?|kgs?|lbs?|pounds?))'
+    r'|(?P<duration>(?P<duration_amount>\d+)\s*(?P<duration_unit>day|week|month)s?)'
+    r'|(?P<number>\d+(?:\.\d+)?)'
+    r'|(?P<metric>kg|lbs|pounds)'
+    r'|(?P<loss>lose|weight)'
+    r'|(?P<gain>gain|muscle))'
+)
+
+class GoalRecord(NamedTuple):
+    """Parsed goal; quantity_kg and duration_days are normalised, the rest is as written"""
+    quantity: Optional[float]
+    metric: str
+    duration: str
+    goal_type: str
+    original_text: str
+    quantity_kg: Optional[float]
+    duration_days: Optional[int]
+
+@lru_cache(maxsize=1024)
+def parse_goal(goal_text: str) -> GoalRecord:
+    """Parse a goal phrase in one pass; repeated phrases come from the cache"""
+    quantity = metric = duration = None
+    quantity_kg = duration_days = None
+    loss = gain = False
+    
+    for match in GOAL_PATTERN.finditer(goal_text.lower()):
+        kind = match.lastgroup
+        if kind == 'mass':
+            amount = float(match.group('mass_amount'))
+            if quantity is None:
+                quantity = amount
+            if quantity_kg is None:
+                quantity_kg = round(amount * KG_PER_UNIT[match.group('mass_unit')], 3)
+        elif kind == 'duration':
+            if quantity is None:
+                quantity = float(match.group('duration_amount'))
+            if duration is None:
+                duration = match.group('duration')
+                duration_days = int(match.group('duration_amount')) * DAYS_PER_UNIT[match.group('duration_unit')]
+        elif kind == 'number':
+            if quantity is None:
+                quantity = float(match.group('number'))
+        elif kind == 'metric':
+            if metric is None:
+                metric = match.group('metric')
+        elif kind == 'loss':
+            loss = True
+        elif kind == 'gain':
+            gain = True
+    
+    # Determine goal type
+    if loss:
+        goal_type = "weight_loss"
+    elif gain:
+        goal_type = "weight_gain"
+    else:
+        goal_type = "fitness"
+    
+    return GoalRecord(quantity, metric or "", duration or "", goal_type, goal_text, quantity_kg, duration_days)
+
+def factorize(texts: Iterable[Any]) -> Tuple[List[str], Any]:
+    """Distinct texts in first-seen order and each row's index into them (missing values become "")"""
+    import numpy as np
+    
+    codes: Dict[str, int] = {}
+    inverse = [codes.setdefault(text if isinstance(text, str) else "", len(codes)) for text in texts]
+    return list(codes), np.asarray(inverse, dtype=np.intp)
 
 class GuardrailValidator:
     """Guardrail validator"""
     
     @staticmethod
+    @traced()
     def validate_goal_input(goal_text: str) -> Dict[str, Any]:
         """Validate goal input"""
-        # Extract quantity, metric, duration
-        quantity_match = re.search(r'(\d+(?:\.\d+)?)', goal_text)
-        metric_match = re.search(r'(kg|lbs|pounds)', goal_text.lower())
-        duration_match = re.search(r'(\d+)\s*(days?|weeks?|months?)', goal_text.lower())
-        
-        quantity = float(quantity_match.group(1)) if quantity_match else None
-        metric = metric_match.group(1) if metric_match else ""
-        duration = duration_match.group(0) if duration_match else ""
-        
-        # Determine goal type
-        if any(word in goal_text.lower() for word in ['lose', 'weight']):
-            goal_type = "weight_loss"
-        elif any(word in goal_text.lower() for word in ['gain', 'muscle']):
-            goal_type = "weight_gain"
-        else:
-            goal_type = "fitness"
-        
+        goal = parse_goal(goal_text)
         return {
-            'quantity': quantity,
-            'metric': metric,
-            'duration': duration,
-            'goal_type': goal_type,
-            'original_text': goal_text
+            'quantity': goal.quantity,
+            'metric': goal.metric,
+            'duration': goal.duration,
+            'goal_type': goal.goal_type,
+            'original_text': goal.original_text,
+            'quantity_kg': goal.quantity_kg,
+            'duration_days': goal.duration_days
         }
     
     @staticmethod
+    @traced()
     def validate_dietary_input(diet_text: str) -> str:
         """Validate dietary input"""
-        allowed_diets = ['vegetarian', 'vegan', 'keto', 'paleo', 'omnivore']
-        
-        for diet in allowed_diets:
+        for diet in ALLOWED_DIETS:
             if diet in diet_text.lower():
                 return diet
         
         return 'omnivore'
     
     @staticmethod
+    def validate_allergens(allergens: Iterable[Any]) -> List[str]:
+        """Keep known allergens, once each, in catalogue order"""
+        from nutrition.catalogue import ALLERGENS
+        
+        wanted = {str(allergen).strip().lower() for allergen in allergens or ()}
+        return [allergen for allergen in ALLERGENS if allergen in wanted]
+    
+    @staticmethod
+    def validate_goal_inputs(goal_texts: Iterable[Any]) -> Dict[str, Any]:
+        """Validate many goals at once into NumPy columns, one row per input
+        
+        Each distinct text is parsed once. Columns: quantity and quantity_kg
+        (float64, NaN when missing), duration_days (int32, -1 when missing),
+        metric (uint8 codes into METRIC_CODES) and goal_type (uint8 codes into
+        GOAL_TYPE_CODES).
+        """
+        import numpy as np
+        
+        unique, inverse = factorize(goal_texts)
+        parse = parse_goal.__wrapped__  # bulk input would only churn the cache
+        metric_codes = {metric: code for code, metric in enumerate(METRIC_CODES)}
+        goal_type_codes = {goal_type: code for code, goal_type in enumerate(GOAL_TYPE_CODES)}
+        
+        quantity, quantity_kg, duration_days, metric, goal_type = [], [], [], [], []
+        for text in unique:
+            goal = parse(text)
+            quantity.append(np.nan if goal.quantity is None else goal.quantity)
+            quantity_kg.append(np.nan if goal.quantity_kg is None else goal.quantity_kg)
+            duration_days.append(-1 if goal.duration_days is None else goal.duration_days)
+            metric.append(metric_codes[goal.metric])
+            goal_type.append(goal_type_codes[goal.goal_type])
+        
+        # Broadcast the per-distinct-text results back to every row
+        return {
+            'quantity': np.array(quantity, dtype=np.float64)[inverse],
+            'quantity_kg': np.array(quantity_kg, dtype=np.float64)[inverse],
+            'duration_days': np.array(duration_days, dtype=np.int32)[inverse],
+            'metric': np.array(metric, dtype=np.uint8)[inverse],
+            'goal_type': np.array(goal_type, dtype=np.uint8)[inverse]
+        }
+    
+    @staticmethod
+    def validate_dietary_inputs(diet_texts: Iterable[Any]) -> Any:
+        """Validate many diet texts at once; returns uint8 codes into ALLOWED_DIETS"""
+        import numpy as np
+        
+        unique, inverse = factorize(diet_texts)
+        lowered = np.char.lower(np.array(unique, dtype=str))
+        codes = np.full(len(unique), ALLOWED_DIETS.index('omnivore'), dtype=np.uint8)
+        unmatched = np.ones(len(unique), dtype=bool)
+        for code, diet in enumerate(ALLOWED_DIETS):
+            hits = unmatched & (np.char.find(lowered, diet) >= 0)
+            codes[hits] = code
+            unmatched &= ~hits
+        return codes[inverse]
+    
+    @staticmethod
+    @traced()
     def validate_output(response_data: Dict[str, Any]) -> Dict[str, Any]:
         """Validate output format"""
         required_fields = ['response_type', 'content']
@@ -55,4 +184,5 @@ class GuardrailValidator:
             if field not in response_data:
                 response_data[field] = 'unknown' if field == 'response_type' else {}
         
-        return response_data
\ No newline at end of file
+        # Check the content against the schema of its response type
+        return response_schemas.check(response_data)
\ No newline at end of file
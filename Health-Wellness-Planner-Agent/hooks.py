@@ -1,63 +1,163 @@
 """
 Lifecycle Hooks for tracking
 """
-from typing import Dict, Any
-from datetime import datetime
+import atexit
+import itertools
+import os
+import time
+from typing import Dict, Any, Callable, List
+from utils.event_sink import RingBufferSink, JsonlFileSink, ConsoleSink, event_to_dict
+from utils.counters import ShardedCounters
+from utils.histogram import LatencyRecorder
+from utils.profiler import profiler
 
 class HookManager:
-    """Simple hook manager for tracking"""
+    """Simple hook manager for tracking
     
-    def __init__(self):
-        self.activity_log = []
-        self.metrics = {
-            'total_interactions': 0,
-            'tool_usage': {},
-            'handoffs': {}
-        }
+    Events go to pluggable sinks instead of stdout: by default only an
+    in-memory ring buffer, plus a background JSONL writer when HOOK_EVENT_LOG
+    is set and console output when HOOK_CONSOLE=1. HOOK_EVENT_SAMPLE_RATE
+    keeps one in N events; metrics are always counted exactly.
+    """
+    
+    def __init__(self, sinks: List[Any] = None, sample_rate: float = None):
+        if sinks is None:
+            sinks = self.default_sinks()
+        self.sinks = list(sinks)
+        self.buffer = next((sink for sink in self.sinks if isinstance(sink, RingBufferSink)), None)
+        
+        if sample_rate is None:
+            sample_rate = float(os.getenv("HOOK_EVENT_SAMPLE_RATE", "1.0"))
+        self.set_sample_rate(sample_rate)
+        self._event_sequence = itertools.count()
+        
+        # Per-thread counter shards, merged when metrics are read
+        self.counters = ShardedCounters()
+        self.latency = LatencyRecorder()
+        self.metric_sources: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self.register_metrics_source('events', self.get_event_stats)
+        self.register_metrics_source('latency', self.get_latency)
+        self.register_metrics_source('profiler', profiler.get_stats)
+        
+        # Flush buffered sinks (e.g. the JSONL writer's backlog) when the process exits
+        atexit.register(self.close)
+    
+    @staticmethod
+    def default_sinks() -> List[Any]:
+        """Build the sinks configured through the environment"""
+        sinks = [RingBufferSink(int(os.getenv("HOOK_EVENT_BUFFER", "1000")))]
+        if os.getenv("HOOK_EVENT_LOG"):
+            sinks.append(JsonlFileSink(os.getenv("HOOK_EVENT_LOG"), capacity=int(os.getenv("HOOK_EVENT_LOG_QUEUE", "10000"))))
+        if os.getenv("HOOK_CONSOLE") == "1":
+            sinks.append(ConsoleSink())
+        return sinks
+    
+    def set_sample_rate(self, sample_rate: float):
+        """Keep roughly sample_rate of events (1.0 keeps all, 0 keeps none)"""
+        self.sample_rate = sample_rate
+        self._sample_every = round(1 / sample_rate) if sample_rate > 0 else 0
+    
+    def add_sink(self, sink: Any):
+        """Attach another event sink"""
+        self.sinks.append(sink)
+    
+    def emit(self, event: str, first: Any = None, second: Any = None):
+        """Send an event to every sink, subject to sampling"""
+        every = self._sample_every
+        if every != 1 and (every == 0 or next(self._event_sequence) % every):
+            return
+        record = (time.monotonic_ns(), event, first, second)
+        for sink in self.sinks:
+            sink.emit(record)
+    
+    @property
+    def activity_log(self) -> List[Dict[str, Any]]:
+        """Recent events from the ring buffer, formatted on read"""
+        if self.buffer is None:
+            return []
+        return [event_to_dict(event) for event in self.buffer.recent()]
     
     def log_agent_start(self, agent_name: str):
         """Log when agent starts"""
-        self.activity_log.append({
-            'timestamp': datetime.now().isoformat(),
-            'event': 'agent_start',
-            'agent': agent_name
-        })
-        self.metrics['total_interactions'] += 1
-        print(f"🤖 Agent started: {agent_name}")
+        self.emit('agent_start', agent_name)
+        self.counters.add('total_interactions')
     
     def log_tool_start(self, tool_name: str):
         """Log when tool starts"""
-        self.activity_log.append({
-            'timestamp': datetime.now().isoformat(),
-            'event': 'tool_start',
-            'tool': tool_name
-        })
-        
-        if tool_name not in self.metrics['tool_usage']:
-            self.metrics['tool_usage'][tool_name] = 0
-        self.metrics['tool_usage'][tool_name] += 1
-        
-        print(f"🔧 Tool started: {tool_name}")
+        self.emit('tool_start', tool_name)
+        self.counters.add(('tool_usage', tool_name))
     
     def log_handoff(self, from_agent: str, to_agent: str):
         """Log handoff"""
-        self.activity_log.append({
-            'timestamp': datetime.now().isoformat(),
-            'event': 'handoff',
-            'from_agent': from_agent,
-            'to_agent': to_agent
-        })
-        
-        handoff_key = f"{from_agent}_to_{to_agent}"
-        if handoff_key not in self.metrics['handoffs']:
-            self.metrics['handoffs'][handoff_key] = 0
-        self.metrics['handoffs'][handoff_key] += 1
+        self.emit('handoff', from_agent, to_agent)
+        self.counters.add(('handoffs', f"{from_agent}_to_{to_agent}"))
+    
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        """Interaction, tool usage and handoff counts summed over all threads"""
+        metrics = {
+            'total_interactions': 0,
+            'tool_usage': {},
+            'handoffs': {}
+        }
+        for key, value in self.counters.merged().items():
+            if isinstance(key, tuple):
+                group, name = key
+                metrics[group][name] = value
+            else:
+                metrics[key] = value
+        return metrics
+    
+    def record_latency(self, micros: int, **keys: str):
+        """Record a handler latency under each dimension, e.g. tool=..., intent=..."""
+        self.latency.record(micros, **keys)
+    
+    def get_latency(self, reset: bool = False) -> Dict[str, Any]:
+        """Get p50/p90/p99/max per tool, handoff, intent and response type
         
-        print(f"🔄 Handoff: {from_agent} → {to_agent}")
+        With reset=True the histograms start a fresh interval, so periodic
+        callers get per-interval percentiles; the exported histograms stay
+        cumulative.
+        """
+        return self.latency.snapshot(reset)
+    
+    def enable_profiling(self, every: int = 1, duration: float = None):
+        """Profile 1 in `every` process_message calls, for `duration` seconds if given"""
+        profiler.enable(every, duration)
+    
+    def disable_profiling(self):
+        """Stop profiling; collected stacks are kept until reset"""
+        profiler.disable()
+    
+    def write_profile(self, directory: str, reset: bool = False) -> List[str]:
+        """Write collapsed-stack flamegraph files (all + per intent) to a directory"""
+        paths = profiler.write(directory)
+        if reset:
+            profiler.reset()
+        return paths
+    
+    def get_event_stats(self) -> Dict[str, Any]:
+        """Get buffer depth and writer backlog of every sink"""
+        stats = {'sample_rate': self.sample_rate}
+        for sink in self.sinks:
+            stats.update(sink.get_stats())
+        return stats
+    
+    def close(self):
+        """Flush and stop every sink"""
+        for sink in self.sinks:
+            sink.close()
+    
+    def register_metrics_source(self, name: str, source: Callable[[], Dict[str, Any]]):
+        """Register a callable whose output is merged into get_metrics()"""
+        self.metric_sources[name] = source
     
     def get_metrics(self) -> Dict[str, Any]:
         """Get current metrics"""
-        return self.metrics
+        metrics = self.metrics
+        for name, source in self.metric_sources.items():
+            metrics[name] = source()
+        return metrics
 
 # Global hook manager
-hook_manager = HookManager()
\ No newline at end of file
+hook_manager = HookManager()
@@ -7,7 +7,10 @@ import random
 from datetime import datetime
 load_dotenv()
 from agent import HealthWellnessAgent
-from context import UserSessionContext, RunContextWrapper
+from context import RunContextWrapper
+from session_repository import get_session_repository
+from nutrition.energy import ACTIVITY_LEVELS, SEX_CODES, energy_for
+from utils.metrics_exporter import start_from_env
 
 # --- New: Habit Tracker Data Structure ---
 def get_habits():
@@ -48,15 +51,16 @@ def main():
         layout="wide"
     )
     
+    # Metrics endpoint / textfile, when configured
+    start_from_env()
+    
     # Initialize session state
     if 'agent' not in st.session_state:
         st.session_state.agent = HealthWellnessAgent()
     
     if 'context' not in st.session_state:
-        st.session_state.context = RunContextWrapper(UserSessionContext(
-            name="",
-            uid=12345
-        ))
+        # Sessions are persisted by uid and survive restarts
+        st.session_state.context = RunContextWrapper(get_session_repository().get(12345))
     
     if 'messages' not in st.session_state:
         st.session_state.messages = []
@@ -72,6 +76,37 @@ def main():
         name = st.text_input("Name", value=st.session_state.context.get_context().name)
         if name != st.session_state.context.get_context().name:
             st.session_state.context.update_context(name=name)
+            get_session_repository().save(st.session_state.context.get_context())
+        
+        # Body metrics drive the calorie target; 0 / blank means not given
+        profile = st.session_state.context.get_context()
+        with st.expander("Body Metrics"):
+            age = st.number_input("Age", min_value=0, max_value=120, value=int(profile.age or 0), step=1)
+            sex = st.selectbox("Sex", SEX_CODES, index=SEX_CODES.index(profile.sex or ""),
+                               format_func=lambda value: value.title() or "Not set")
+            height_cm = st.number_input("Height (cm)", min_value=0.0, max_value=250.0,
+                                        value=float(profile.height_cm or 0.0), step=0.5)
+            weight_kg = st.number_input("Weight (kg)", min_value=0.0, max_value=400.0,
+                                        value=float(profile.weight_kg or 0.0), step=0.1)
+            activity_level = st.selectbox("Activity Level", ACTIVITY_LEVELS,
+                                          index=ACTIVITY_LEVELS.index(profile.activity_level or ""),
+                                          format_func=lambda value: value.replace("_", " ").title() or "Not set")
+        body_metrics = {
+            "age": age or None,
+            "sex": sex or None,
+            "height_cm": height_cm or None,
+            "weight_kg": weight_kg or None,
+            "activity_level": activity_level or None
+        }
+        if any(getattr(profile, field) != value for field, value in body_metrics.items()):
+            # New metrics mean a new calorie target, set in the same critical section
+            with profile.lock:
+                st.session_state.context.update_context(**body_metrics)
+                st.session_state.context.update_context(calorie_target=energy_for(profile).calories)
+            get_session_repository().save(profile)
+        
+        if profile.calorie_target:
+            st.write(f"**Daily Calorie Target:** {profile.calorie_target} kcal")
         
         # Show current goal
         goal = st.session_state.context.get_context().goal
@@ -127,6 +162,7 @@ def main():
                 with st.spinner("Thinking..."):
                     try:
                         response = st.session_state.agent.process_message(prompt, st.session_state.context)
+                        get_session_repository().save(st.session_state.context.get_context())
                         
                         if response['response_type'] == 'error':
                             st.error(f"Error: {response['content']['error']}")
@@ -150,10 +186,16 @@ def main():
                                             st.write(f"**Snack:** {meals['snack']}")
                                 
                                 elif 'weekly_plan' in content:
-                                    st.subheader("💪 Your Workout Plan")
-                                    for day_plan in content['weekly_plan']:
+                                    week = content.get('current_week')
+                                    if week:
+                                        st.subheader(f"💪 Week {week['week']} of {content['programme']['weeks']} ({week['phase']})")
+                                    else:
+                                        st.subheader("💪 Your Workout Plan")
+                                    for day_plan in (week['days'] if week else content['weekly_plan']):
                                         with st.expander(f"{day_plan['day']} - {day_plan['focus']}"):
                                             st.write(f"**Exercises:** {', '.join(day_plan['exercises'])}")
+                                            for prescription in day_plan.get('prescriptions', []):
+                                                st.write(f"- {prescription['exercise']}: {prescription['sets']} x {prescription['reps']} at {prescription['load_pct']}%")
                                             st.write(f"**Duration:** {day_plan.get('duration', '30 minutes')}")
                                             if 'notes' in day_plan:
                                                 st.write(f"**Notes:** {day_plan['notes']}")
@@ -0,0 +1,169 @@
+"""
+Recipe catalogue held as NumPy columns
+"""
+import csv
+import os
+import threading
+from typing import Any, Callable, Dict, List
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CATALOGUE_PATH = os.path.join(PROJECT_ROOT, "data", "recipes.csv")
+
+# Meal slots in planning order
+SLOTS = ("breakfast", "lunch", "dinner", "snack")
+SLOT_CODES = {slot: code for code, slot in enumerate(SLOTS)}
+
+# One bit per diet tag; an omnivore plan has no tag requirement
+DIET_TAGS = ("vegetarian", "vegan", "keto", "paleo")
+DIET_BITS = {tag: 1 << bit for bit, tag in enumerate(DIET_TAGS)}
+
+# One bit per allergen a recipe contains
+ALLERGENS = ("nuts", "peanuts", "dairy", "eggs", "gluten", "soy", "fish", "shellfish", "sesame")
+ALLERGEN_BITS = {allergen: 1 << bit for bit, allergen in enumerate(ALLERGENS)}
+
+NUTRIENTS = ("calories", "protein_g", "carbs_g", "fat_g")
+
+# Glycemic index assumed for recipes that do not list one (medium)
+DEFAULT_GLYCEMIC_INDEX = 55.0
+
+def tag_mask(tags: str, bits: Dict[str, int]) -> int:
+    """Bitmask for a ';'-separated tag list"""
+    mask = 0
+    for tag in tags.split(";"):
+        tag = tag.strip().lower()
+        if tag:
+            mask |= bits[tag]
+    return mask
+
+class RecipeCatalogue:
+    """Recipes as parallel arrays: one row per recipe
+
+    Columns: ids (int32), slot (uint8 codes into SLOTS), calories, protein_g,
+    carbs_g, fat_g (float32, per serving), glycemic_index and the derived
+    glycemic_load per serving (float32), diets (uint16 bitmask of DIET_TAGS)
+    and allergens (uint16 bitmask of ALLERGENS). Names stay a Python list;
+    they are only read for chosen rows.
+    """
+
+    def __init__(self, names: List[str], columns: Dict[str, Any]):
+        self.names = names
+        self.ids = columns["ids"]
+        self.slot = columns["slot"]
+        self.calories = columns["calories"]
+        self.protein_g = columns["protein_g"]
+        self.carbs_g = columns["carbs_g"]
+        self.fat_g = columns["fat_g"]
+        self.glycemic_index = columns["glycemic_index"]
+        self.glycemic_load = (self.glycemic_index * self.carbs_g / 100).astype(np.float32)
+        self.diets = columns["diets"]
+        self.allergens = columns["allergens"]
+        self._rows_by_id = None
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def from_csv(cls, path: str) -> "RecipeCatalogue":
+        """Load a catalogue CSV (id,name,slot,calories,protein_g,carbs_g,fat_g[,glycemic_index],diets[,allergens])"""
+        names, ids, slots, diets, allergens, glycemic_index = [], [], [], [], [], []
+        nutrients: Dict[str, List[float]] = {name: [] for name in NUTRIENTS}
+        with open(path, newline="", encoding="utf-8") as handle:
+            for row in csv.DictReader(handle):
+                names.append(row["name"])
+                ids.append(int(row["id"]))
+                slots.append(SLOT_CODES[row["slot"]])
+                diets.append(tag_mask(row["diets"], DIET_BITS))
+                allergens.append(tag_mask(row.get("allergens") or "", ALLERGEN_BITS))
+                glycemic_index.append(float(row.get("glycemic_index") or DEFAULT_GLYCEMIC_INDEX))
+                for name in NUTRIENTS:
+                    nutrients[name].append(float(row[name]))
+
+        columns = {
+            "ids": np.array(ids, dtype=np.int32),
+            "slot": np.array(slots, dtype=np.uint8),
+            "diets": np.array(diets, dtype=np.uint16),
+            "allergens": np.array(allergens, dtype=np.uint16),
+            "glycemic_index": np.array(glycemic_index, dtype=np.float32)
+        }
+        for name in NUTRIENTS:
+            columns[name] = np.array(nutrients[name], dtype=np.float32)
+        return cls(names, columns)
+
+    @classmethod
+    def synthetic(cls, size: int, seed: int = 0) -> "RecipeCatalogue":
+        """Random but plausible catalogue of `size` recipes, for benchmarks"""
+        rng = np.random.default_rng(seed)
+        slot = rng.integers(0, len(SLOTS), size).astype(np.uint8)
+
+        # Calories by slot, split into macros by a random energy share
+        slot_calories = np.array([400, 600, 650, 200], dtype=np.float32)
+        calories = slot_calories[slot] * rng.uniform(0.6, 1.4, size).astype(np.float32)
+        shares = rng.dirichlet((2.0, 3.0, 2.5), size).astype(np.float32)
+        protein_g = calories * shares[:, 0] / 4
+        carbs_g = calories * shares[:, 1] / 4
+        fat_g = calories * shares[:, 2] / 9
+
+        # Vegan implies vegetarian; keto needs few carbs
+        vegetarian = rng.random(size) < 0.5
+        vegan = vegetarian & (rng.random(size) < 0.4)
+        keto = carbs_g * 4 < calories * 0.15
+        paleo = rng.random(size) < 0.3
+        diets = (vegetarian * DIET_BITS["vegetarian"] | vegan * DIET_BITS["vegan"]
+                 | keto * DIET_BITS["keto"] | paleo * DIET_BITS["paleo"]).astype(np.uint16)
+
+        # Each allergen in about one recipe in eight, never animal ones in plant-based recipes
+        allergens = np.zeros(size, dtype=np.uint16)
+        for allergen, bit in ALLERGEN_BITS.items():
+            present = rng.random(size) < 0.125
+            if allergen in ("dairy", "eggs"):
+                present &= ~vegan
+            elif allergen in ("fish", "shellfish"):
+                present &= ~vegetarian
+            allergens |= (present * bit).astype(np.uint16)
+
+        names = [f"Recipe {index}" for index in range(1, size + 1)]
+        columns = {
+            "ids": np.arange(1, size + 1, dtype=np.int32),
+            "slot": slot,
+            "calories": calories,
+            "protein_g": protein_g.astype(np.float32),
+            "carbs_g": carbs_g.astype(np.float32),
+            "fat_g": fat_g.astype(np.float32),
+            "glycemic_index": rng.uniform(20, 85, size).astype(np.float32),
+            "diets": diets,
+            "allergens": allergens
+        }
+        return cls(names, columns)
+
+    def rows_for_ids(self, recipe_ids: Any) -> Any:
+        """Row positions of recipe ids, -1 for ids not in the catalogue"""
+        if self._rows_by_id is None:
+            self._rows_by_id = {int(recipe_id): row for row, recipe_id in enumerate(self.ids.tolist())}
+        return np.array([self._rows_by_id.get(int(recipe_id), -1) for recipe_id in recipe_ids], dtype=np.intp)
+
+# Global catalogue, loaded on first use
+_catalogue = None
+_catalogue_lock = threading.Lock()
+_listeners: List[Callable[[], None]] = []
+
+def get_catalogue() -> RecipeCatalogue:
+    """Get the process-wide recipe catalogue (RECIPE_CATALOGUE or data/recipes.csv)"""
+    global _catalogue
+    if _catalogue is None:
+        with _catalogue_lock:
+            if _catalogue is None:
+                _catalogue = RecipeCatalogue.from_csv(os.getenv("RECIPE_CATALOGUE", DEFAULT_CATALOGUE_PATH))
+    return _catalogue
+
+def set_catalogue(catalogue: RecipeCatalogue):
+    """Swap in another catalogue and notify listeners (e.g. to drop cached plans)"""
+    global _catalogue
+    with _catalogue_lock:
+        _catalogue = catalogue
+    for listener in list(_listeners):
+        listener()
+
+def on_catalogue_change(listener: Callable[[], None]):
+    """Call listener whenever set_catalogue() replaces the catalogue"""
+    _listeners.append(listener)
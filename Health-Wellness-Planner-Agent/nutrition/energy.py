@@ -0,0 +1,145 @@
+"""
+Energy expenditure (Mifflin-St Jeor BMR / TDEE) and goal-adjusted calorie targets
+"""
+import math
+from typing import Any, Dict, Iterable, NamedTuple, Sequence
+import numpy as np
+from guardrails import GOAL_TYPE_CODES
+
+# Category order for the uint8 codes of the batch API; "" means not given
+SEX_CODES = ("", "male", "female")
+SEX_ALIASES = {"m": "male", "man": "male", "male": "male", "f": "female", "woman": "female", "female": "female"}
+ACTIVITY_LEVELS = ("", "sedentary", "light", "moderate", "active", "very_active")
+
+# Mifflin-St Jeor: 10 * kg + 6.25 * cm - 5 * age + offset; unknown sex takes the midpoint
+SEX_OFFSETS = np.array([-78.0, 5.0, -161.0])
+ACTIVITY_FACTORS = np.array([1.375, 1.2, 1.375, 1.55, 1.725, 1.9])
+
+# Stand-ins for body metrics that were not given
+DEFAULT_AGE = 30.0
+DEFAULT_HEIGHT_CM = 170.0
+DEFAULT_WEIGHT_KG = 70.0
+
+# Daily expenditure assumed when no body metric is known at all
+BASELINE_TDEE = 2000.0
+
+# Goal adjustment: paced by the goal's kg and days when given, else a default,
+# capped at a share of TDEE and never below a floor intake (by sex code)
+KCAL_PER_KG = 7700.0
+DEFAULT_DEFICIT = 500.0
+DEFAULT_SURPLUS = 300.0
+MAX_DEFICIT_SHARE = 0.25
+MAX_SURPLUS_SHARE = 0.15
+MIN_CALORIES = np.array([1350.0, 1500.0, 1200.0])
+
+GOAL_CODES = {goal_type: code for code, goal_type in enumerate(GOAL_TYPE_CODES)}
+
+class EnergyTargets(NamedTuple):
+    """One person's expenditure and goal-adjusted intake"""
+    bmr: float
+    tdee: float
+    calories: int
+
+def energy_targets(age: Any, sex: Any, height_cm: Any, weight_kg: Any, activity: Any, goal_type: Any,
+                   quantity_kg: Any = None, duration_days: Any = None) -> Dict[str, Any]:
+    """BMR, TDEE and daily calorie targets for a whole population in one pass
+
+    Body metrics are float arrays with NaN when unknown; sex, activity and
+    goal_type are uint8 codes into SEX_CODES, ACTIVITY_LEVELS and
+    GOAL_TYPE_CODES; quantity_kg (NaN) and duration_days (-1) when missing
+    match GuardrailValidator.validate_goal_inputs(). Returns float64 bmr and
+    tdee (NaN / BASELINE_TDEE when no body metric is known) and int32 calories
+    rounded to 10 kcal.
+    """
+    age = np.asarray(age, dtype=np.float64)
+    height_cm = np.asarray(height_cm, dtype=np.float64)
+    weight_kg = np.asarray(weight_kg, dtype=np.float64)
+    sex = np.asarray(sex, dtype=np.intp)
+    activity = np.asarray(activity, dtype=np.intp)
+    goal_type = np.asarray(goal_type, dtype=np.intp)
+
+    # Mifflin-St Jeor with defaults for the metrics that are missing
+    unknown = np.isnan(age) & np.isnan(height_cm) & np.isnan(weight_kg)
+    bmr = (10.0 * np.where(np.isnan(weight_kg), DEFAULT_WEIGHT_KG, weight_kg)
+           + 6.25 * np.where(np.isnan(height_cm), DEFAULT_HEIGHT_CM, height_cm)
+           - 5.0 * np.where(np.isnan(age), DEFAULT_AGE, age)
+           + SEX_OFFSETS[sex])
+    bmr[unknown] = np.nan
+    tdee = np.where(unknown, BASELINE_TDEE, bmr * ACTIVITY_FACTORS[activity])
+
+    # Daily change needed to reach the goal in time, else the default pace
+    losing = goal_type == GOAL_CODES["weight_loss"]
+    gaining = goal_type == GOAL_CODES["weight_gain"]
+    pace = np.full(tdee.shape, np.nan)
+    if quantity_kg is not None and duration_days is not None:
+        quantity_kg = np.asarray(quantity_kg, dtype=np.float64)
+        duration_days = np.asarray(duration_days, dtype=np.float64)
+        timed = (duration_days > 0) & ~np.isnan(quantity_kg)
+        np.divide(np.abs(quantity_kg) * KCAL_PER_KG, duration_days, out=pace, where=timed)
+    deficit = np.minimum(np.where(np.isnan(pace), DEFAULT_DEFICIT, pace), tdee * MAX_DEFICIT_SHARE)
+    surplus = np.minimum(np.where(np.isnan(pace), DEFAULT_SURPLUS, pace), tdee * MAX_SURPLUS_SHARE)
+
+    calories = tdee - np.where(losing, deficit, 0.0) + np.where(gaining, surplus, 0.0)
+    calories = np.maximum(calories, MIN_CALORIES[sex])
+    return {
+        'bmr': bmr,
+        'tdee': tdee,
+        'calories': (np.round(calories / 10) * 10).astype(np.int32)
+    }
+
+def sex_code(sex: Any) -> int:
+    """uint8 code into SEX_CODES for a free-text sex"""
+    return SEX_CODES.index(SEX_ALIASES.get(str(sex or "").strip().lower(), ""))
+
+def activity_code(activity_level: Any) -> int:
+    """uint8 code into ACTIVITY_LEVELS for an activity level"""
+    level = str(activity_level or "").strip().lower().replace(" ", "_")
+    return ACTIVITY_LEVELS.index(level) if level in ACTIVITY_LEVELS else 0
+
+def _number(value: Any) -> float:
+    return math.nan if value is None else float(value)
+
+def profile_columns(profiles: Sequence[Any], goals: Iterable[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """energy_targets() arguments gathered from contexts (None for an unknown profile)
+
+    Goals default to each context's own goal.
+    """
+    if goals is None:
+        goals = [getattr(profile, 'goal', None) for profile in profiles]
+    goals = [goal or {} for goal in goals]
+
+    def column(field: str) -> Any:
+        return np.array([_number(getattr(profile, field, None)) for profile in profiles], dtype=np.float64)
+
+    return {
+        'age': column('age'),
+        'sex': np.array([sex_code(getattr(profile, 'sex', None)) for profile in profiles], dtype=np.uint8),
+        'height_cm': column('height_cm'),
+        'weight_kg': column('weight_kg'),
+        'activity': np.array([activity_code(getattr(profile, 'activity_level', None)) for profile in profiles],
+                             dtype=np.uint8),
+        'goal_type': np.array([GOAL_CODES.get(goal.get('goal_type'), 0) for goal in goals], dtype=np.uint8),
+        'quantity_kg': np.array([_number(goal.get('quantity_kg')) for goal in goals], dtype=np.float64),
+        'duration_days': np.array([goal.get('duration_days') or -1 for goal in goals], dtype=np.int32)
+    }
+
+def energy_for(profile: Any, goal: Dict[str, Any] = None) -> EnergyTargets:
+    """Targets for one context (or None); goal defaults to the context's own"""
+    targets = energy_targets(**profile_columns([profile], None if goal is None else [goal]))
+    return EnergyTargets(float(targets['bmr'][0]), float(targets['tdee'][0]), int(targets['calories'][0]))
+
+def retarget(contexts: Sequence[Any]) -> Dict[str, Any]:
+    """Nightly re-targeting: latest weigh-ins become weight_kg, then every calorie target in one pass
+
+    Writes weight_kg and calorie_target back to each context and returns the
+    energy_targets() columns, one row per context.
+    """
+    for context in contexts:
+        latest = context.progress_metrics.latest_weight()
+        if latest is not None and latest != context.weight_kg:
+            context.update_context(weight_kg=latest)
+
+    targets = energy_targets(**profile_columns(contexts))
+    for context, calories in zip(contexts, targets['calories'].tolist()):
+        context.update_context(calorie_target=calories)
+    return targets
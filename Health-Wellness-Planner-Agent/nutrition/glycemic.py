@@ -0,0 +1,156 @@
+"""
+Glycemic-load scoring of weekly meal plans and lower-load recipe swaps
+"""
+from typing import Any, Dict, List, Sequence, Tuple
+import numpy as np
+from nutrition.catalogue import SLOTS, on_catalogue_change
+from nutrition.planner import MealPlanEngine, MIN_SERVINGS, MAX_SERVINGS, get_engine
+from utils.cache import cached, result_cache
+
+# Daily glycemic load: under 80 counts as low, over 120 as high
+DAILY_GLYCEMIC_LOAD_TARGET = 100.0
+
+# A swap keeps the meal's calories within this share of the original
+SWAP_CALORIE_TOLERANCE = 0.15
+
+# Analyses are keyed by plan contents; recipe data changes invalidate them
+on_catalogue_change(lambda: result_cache.invalidate("glycemic"))
+
+def plan_key(daily_plans: Sequence[Dict[str, Any]]) -> Tuple:
+    """Hashable fingerprint of the recipes and servings in a plan"""
+    return tuple(
+        (day.get("day"), tuple(sorted((day.get("recipe_ids") or {}).items())),
+         tuple(sorted((day.get("servings") or {}).items())))
+        for day in daily_plans
+    )
+
+def plan_matrix(engine: MealPlanEngine, daily_plans: Sequence[Dict[str, Any]]) -> Tuple[Any, Any]:
+    """Catalogue rows (-1 when unknown) and servings of every meal, shaped (days, slots)"""
+    recipe_ids = np.full((len(daily_plans), len(SLOTS)), -1, dtype=np.int64)
+    servings = np.zeros((len(daily_plans), len(SLOTS)), dtype=np.float32)
+    for day_index, day in enumerate(daily_plans):
+        ids = day.get("recipe_ids") or {}
+        portions = day.get("servings") or {}
+        for slot_index, slot in enumerate(SLOTS):
+            if slot in ids:
+                recipe_ids[day_index, slot_index] = ids[slot]
+                servings[day_index, slot_index] = portions.get(slot, 1.0)
+    rows = engine.catalogue.rows_for_ids(recipe_ids.ravel()).reshape(recipe_ids.shape)
+    return rows, servings
+
+def score_plan(engine: MealPlanEngine, daily_plans: Sequence[Dict[str, Any]],
+               target: float = DAILY_GLYCEMIC_LOAD_TARGET) -> Tuple[Dict[str, Any], Any, Any, Any]:
+    """Glycemic load and carbs per meal and per day; also returns the (days, slots) rows, servings and loads"""
+    catalogue = engine.catalogue
+    rows, servings = plan_matrix(engine, daily_plans)
+    known = rows >= 0
+    safe_rows = np.where(known, rows, 0)
+
+    meal_load = np.where(known, catalogue.glycemic_load[safe_rows] * servings, 0.0)
+    meal_carbs = np.where(known, catalogue.carbs_g[safe_rows] * servings, 0.0)
+    day_load = meal_load.sum(axis=1)
+    day_carbs = meal_carbs.sum(axis=1)
+
+    days = []
+    for day_index, day in enumerate(daily_plans):
+        days.append({
+            "day": day.get("day"),
+            "meals": {
+                slot: round(float(meal_load[day_index, slot_index]), 1)
+                for slot_index, slot in enumerate(SLOTS) if known[day_index, slot_index]
+            },
+            "total": round(float(day_load[day_index]), 1),
+            "carbs_g": round(float(day_carbs[day_index]), 1)
+        })
+    score = {
+        "target": target,
+        "weekly_average": round(float(day_load.mean()), 1) if len(day_load) else 0.0,
+        "days_over_target": [day["day"] for day, load in zip(days, day_load) if load > target],
+        "days": days
+    }
+    return score, rows, servings, meal_load
+
+def propose_swaps(engine: MealPlanEngine, day_names: Sequence[str], rows: Any, servings: Any, meal_load: Any,
+                  diet_type: str, allergens: Sequence[str] = (),
+                  target: float = DAILY_GLYCEMIC_LOAD_TARGET) -> List[Dict[str, Any]]:
+    """Swaps that bring days over the target down, largest load reduction first
+
+    For each slot, every over-target day is scored against every candidate in
+    one (days x candidates) pass: candidates are portioned to the meal's
+    calories (in half servings), must land within SWAP_CALORIE_TOLERANCE of
+    them, and the one cutting the most glycemic load is that meal's option.
+    Each day then takes its best options until it is under the target.
+    """
+    catalogue = engine.catalogue
+    day_load = meal_load.sum(axis=1)
+    over = np.flatnonzero(day_load > target)
+    if not len(over):
+        return []
+
+    # options[day] -> (reduction, slot index, candidate row, servings, load after)
+    options: Dict[int, List[Tuple[float, int, int, float, float]]] = {int(day): [] for day in over}
+    candidates = engine.candidates(diet_type, allergens)
+    for slot_index, (candidate_rows, nutrients, inverse_calories) in enumerate(candidates):
+        current_rows = rows[over, slot_index]
+        known = current_rows >= 0
+        if not known.any():
+            continue
+        days = over[known]
+        current_rows = current_rows[known]
+        current_calories = catalogue.calories[current_rows] * servings[days, slot_index]
+
+        portions = np.round(2 * current_calories[:, None] * inverse_calories[None, :]) / 2
+        np.clip(portions, MIN_SERVINGS, MAX_SERVINGS, out=portions)
+        tolerance = SWAP_CALORIE_TOLERANCE * current_calories[:, None]
+        fits = np.abs(nutrients[0] * portions - current_calories[:, None]) <= tolerance
+        load = catalogue.glycemic_load[candidate_rows][None, :] * portions
+        reduction = np.where(fits, meal_load[days, slot_index][:, None] - load, -np.inf)
+
+        best = np.argmax(reduction, axis=1)
+        for position, day in enumerate(days.tolist()):
+            choice = best[position]
+            cut = float(reduction[position, choice])
+            if cut > 0 and candidate_rows[choice] != current_rows[position]:
+                options[day].append((cut, slot_index, int(candidate_rows[choice]),
+                                     float(portions[position, choice]), float(load[position, choice])))
+
+    swaps = []
+    for day, day_options in options.items():
+        remaining = float(day_load[day])
+        for cut, slot_index, row, portion, load in sorted(day_options, reverse=True):
+            if remaining <= target:
+                break
+            remaining -= cut
+            current = int(rows[day, slot_index])
+            swaps.append({
+                "day": day_names[day],
+                "slot": SLOTS[slot_index],
+                "current": catalogue.names[current],
+                "replacement": catalogue.names[row],
+                "recipe_id": int(catalogue.ids[row]),
+                "servings": portion,
+                "glycemic_load_before": round(float(meal_load[day, slot_index]), 1),
+                "glycemic_load_after": round(load, 1)
+            })
+    return swaps
+
+@cached("glycemic", key=lambda daily_plans, diet_type, allergens=(), target=DAILY_GLYCEMIC_LOAD_TARGET: (
+    plan_key(daily_plans), diet_type, tuple(allergens), target
+))
+def analyse_plan(daily_plans: Sequence[Dict[str, Any]], diet_type: str, allergens: Sequence[str] = (),
+                 target: float = DAILY_GLYCEMIC_LOAD_TARGET) -> Dict[str, Any]:
+    """Score a plan's glycemic load and propose swaps; cached until the plan changes"""
+    engine = get_engine()
+    analysis, rows, servings, meal_load = score_plan(engine, daily_plans, target)
+    day_names = [day["day"] for day in analysis["days"]]
+    swaps = propose_swaps(engine, day_names, rows, servings, meal_load, diet_type, allergens, target)
+
+    # Projected day totals once the proposed swaps are made
+    days = {day["day"]: day for day in analysis["days"]}
+    for swap in swaps:
+        day = days[swap["day"]]
+        day["total_after_swaps"] = round(
+            day.get("total_after_swaps", day["total"]) - swap["glycemic_load_before"] + swap["glycemic_load_after"], 1
+        )
+    analysis["swaps"] = swaps
+    return analysis
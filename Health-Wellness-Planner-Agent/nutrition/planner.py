@@ -0,0 +1,175 @@
+"""
+Vectorised weekly meal planner over the recipe catalogue
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Sequence, Tuple
+import numpy as np
+from nutrition.catalogue import RecipeCatalogue, SLOTS, DIET_BITS, get_catalogue
+from nutrition.recipe_index import RecipeIndex
+
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+# Share of the day's targets each slot aims for
+SLOT_SHARES = {"breakfast": 0.25, "lunch": 0.35, "dinner": 0.30, "snack": 0.10}
+
+# Energy split (protein, carbs, fat) by goal; keto overrides the goal split
+MACRO_SPLITS = {
+    "weight_loss": (0.30, 0.40, 0.30),
+    "weight_gain": (0.25, 0.50, 0.25),
+    "fitness": (0.20, 0.50, 0.30)
+}
+KETO_SPLIT = (0.25, 0.05, 0.70)
+KCAL_PER_GRAM = np.array([4.0, 4.0, 9.0], dtype=np.float32)
+
+# Score weights for the relative error of calories, protein, carbs and fat
+SCORE_WEIGHTS = np.array([4.0, 2.0, 1.0, 1.0], dtype=np.float32)
+
+# Servings are picked in half portions
+MIN_SERVINGS = 0.5
+MAX_SERVINGS = 2.0
+
+# Candidate arrays kept per (diet, allergens) combination
+CANDIDATE_CACHE_SIZE = 32
+
+class MacroTargets(NamedTuple):
+    """Daily energy and macro targets"""
+    calories: float
+    protein_g: float
+    carbs_g: float
+    fat_g: float
+
+def macro_targets(calories: float, goal_type: str = None, diet_type: str = None) -> MacroTargets:
+    """Split a calorie target into grams of protein, carbs and fat"""
+    split = KETO_SPLIT if diet_type == "keto" else MACRO_SPLITS.get(goal_type, MACRO_SPLITS["fitness"])
+    grams = np.array(split, dtype=np.float32) * calories / KCAL_PER_GRAM
+    return MacroTargets(float(calories), *(round(float(gram), 1) for gram in grams))
+
+class MealPlanEngine:
+    """Greedy planner: one slot at a time, scored across all candidates at once
+
+    For each day the slots are filled in order. A slot's target is its share of
+    what is left of the day's budget, so an over- or under-shooting breakfast
+    is corrected by the meals after it. Every candidate recipe is scored in one
+    NumPy pass: servings are rounded to the half portion closest to the calorie
+    target, then the weighted squared relative error of calories and macros is
+    minimised. Recipes already used this week are skipped until a slot runs out
+    of fresh candidates. Candidates come from the recipe index, so excluding
+    allergens costs a few bitset operations.
+    """
+
+    def __init__(self, catalogue: RecipeCatalogue, index: RecipeIndex = None):
+        self.catalogue = catalogue
+        self.index = index or RecipeIndex.from_catalogue(catalogue)
+        # One row per nutrient so each scoring step streams over contiguous memory
+        self.nutrients = np.stack([catalogue.calories, catalogue.protein_g, catalogue.carbs_g, catalogue.fat_g])
+        self._candidates: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def candidates(self, diet_type: str, allergens: Sequence[str] = ()) -> List[Tuple[Any, Any, Any]]:
+        """Per slot: (catalogue rows, nutrient matrix, 1 / calories) of recipes suitable for the diet"""
+        key = (diet_type, tuple(sorted(allergens)))
+        with self._lock:
+            slots = self._candidates.get(key)
+            if slots is not None:
+                self._candidates.move_to_end(key)
+                return slots
+
+        diet_tags = (diet_type,) if diet_type in DIET_BITS else ()
+        slots = []
+        for slot in SLOTS:
+            rows = self.index.rows(self.index.query((slot,) + diet_tags, key[1]))
+            if not len(rows) and diet_tags:
+                # Better an off-diet dish than an empty slot, but never an allergen
+                rows = self.index.rows(self.index.query((slot,), key[1]))
+            if not len(rows):
+                avoided = f" free of {', '.join(key[1])}" if key[1] else ""
+                raise ValueError(f"Recipe catalogue has no {slot} recipes{avoided}")
+            nutrients = np.ascontiguousarray(self.nutrients[:, rows])
+            slots.append((rows, nutrients, 1.0 / np.maximum(nutrients[0], 1.0)))
+
+        with self._lock:
+            self._candidates[key] = slots
+            while len(self._candidates) > CANDIDATE_CACHE_SIZE:
+                self._candidates.popitem(last=False)
+        return slots
+
+    def plan(self, diet_type: str, targets: MacroTargets, days: Tuple[str, ...] = DAYS,
+             allergens: Sequence[str] = ()) -> List[Dict[str, Any]]:
+        """Daily plans hitting the targets as closely as the catalogue allows, free of the allergens"""
+        slots = self.candidates(diet_type, allergens)
+        used = [np.zeros(len(rows), dtype=bool) for rows, _, _ in slots]
+        daily_target = np.array(targets, dtype=np.float32)
+        shares = [SLOT_SHARES[slot] for slot in SLOTS]
+
+        daily_plans = []
+        for day in days:
+            remaining = daily_target.copy()
+            remaining_share = 1.0
+            meals, servings, recipe_ids = {}, {}, {}
+            totals = np.zeros(4, dtype=np.float32)
+
+            for index, slot in enumerate(SLOTS):
+                rows, nutrients, inverse_calories = slots[index]
+                share = shares[index] / remaining_share
+                remaining_share -= shares[index]
+                target = np.maximum(remaining * share, daily_target * 0.02)
+
+                # Half portions closest to the calorie target
+                portions = inverse_calories * (2 * target[0])
+                np.round(portions, out=portions)
+                portions *= 0.5
+                np.clip(portions, MIN_SERVINGS, MAX_SERVINGS, out=portions)
+
+                # Weighted squared relative error of every candidate, in place
+                error = nutrients * (1 / target)[:, None]
+                error *= portions
+                error -= 1
+                np.square(error, out=error)
+                score = SCORE_WEIGHTS @ error
+
+                if not used[index].all():
+                    score[used[index]] = np.inf
+                choice = int(np.argmin(score))
+                used[index][choice] = True
+
+                row = rows[choice]
+                portion = float(portions[choice])
+                chosen = nutrients[:, choice] * portion
+                totals += chosen
+                remaining -= chosen
+                meals[slot] = self.catalogue.names[row]
+                servings[slot] = portion
+                recipe_ids[slot] = int(self.catalogue.ids[row])
+
+            daily_plans.append({
+                "day": day,
+                "meals": meals,
+                "servings": servings,
+                "recipe_ids": recipe_ids,
+                "calories": int(round(float(totals[0]))),
+                "macros": {
+                    "protein_g": round(float(totals[1]), 1),
+                    "carbs_g": round(float(totals[2]), 1),
+                    "fat_g": round(float(totals[3]), 1)
+                }
+            })
+        return daily_plans
+
+# Engine over the current global catalogue, rebuilt when it changes
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine() -> MealPlanEngine:
+    """Planner over nutrition.catalogue.get_catalogue(), its index mapped from RECIPE_INDEX if set"""
+    global _engine
+    catalogue = get_catalogue()
+    engine = _engine
+    if engine is None or engine.catalogue is not catalogue:
+        with _engine_lock:
+            if _engine is None or _engine.catalogue is not catalogue:
+                index = RecipeIndex.for_catalogue(catalogue, os.getenv("RECIPE_INDEX"))
+                _engine = MealPlanEngine(catalogue, index)
+            engine = _engine
+    return engine
@@ -0,0 +1,122 @@
+"""
+Inverted bitset index over recipe slots, diet tags and allergens
+"""
+import hashlib
+import os
+from typing import Any, Sequence
+import numpy as np
+from nutrition.catalogue import RecipeCatalogue, SLOTS, SLOT_CODES, DIET_TAGS, DIET_BITS, ALLERGENS, ALLERGEN_BITS
+
+# One bitset row per tag, in this order
+INDEX_TAGS = SLOTS + DIET_TAGS + ALLERGENS
+TAG_ROWS = {tag: row for row, tag in enumerate(INDEX_TAGS)}
+
+def pack_mask(mask: Any) -> Any:
+    """Boolean mask -> little-endian uint64 words, bit i of the set = recipe row i"""
+    packed = np.packbits(mask, bitorder="little")
+    padded = np.zeros(-(-len(packed) // 8) * 8, dtype=np.uint8)
+    padded[:len(packed)] = packed
+    return padded.view("<u8")
+
+def catalogue_fingerprint(catalogue: RecipeCatalogue) -> str:
+    """Hash of the tag layout and every column the index is built from"""
+    digest = hashlib.sha256(";".join(INDEX_TAGS).encode("utf-8"))
+    for column in (catalogue.ids, catalogue.slot, catalogue.diets, catalogue.allergens):
+        digest.update(np.ascontiguousarray(column).tobytes())
+    return digest.hexdigest()
+
+def fingerprint_path(path: str) -> str:
+    """Sidecar file holding the fingerprint of the catalogue an index file was built from"""
+    return path + ".fingerprint"
+
+class RecipeIndex:
+    """One bitset per tag over every recipe in the catalogue
+
+    Queries AND the bitsets of required tags and AND NOT those of excluded tags,
+    one 64-bit word per 64 recipes, so "vegan, nut-free, gluten-free" touches a
+    few kilobytes even for 100k recipes. The bitsets are a single uint64 matrix
+    that save() writes as .npy and load() memory-maps back; the catalogue's
+    fingerprint is saved next to it so a file is never reused for another
+    catalogue.
+    """
+
+    def __init__(self, bits: Any, fingerprint: str = None):
+        if bits.ndim != 2 or bits.shape[0] != len(INDEX_TAGS):
+            raise ValueError(f"Recipe index needs {len(INDEX_TAGS)} tag rows, got shape {bits.shape}")
+        self.bits = bits
+        self.fingerprint = fingerprint
+        # Every recipe sits in exactly one slot, so the slot rows together cover the catalogue
+        self.everything = np.bitwise_or.reduce(bits[:len(SLOTS)], axis=0)
+        self.size = self.count(self.everything)
+
+    @classmethod
+    def from_catalogue(cls, catalogue: RecipeCatalogue) -> "RecipeIndex":
+        """Build the bitsets from the catalogue's slot, diet and allergen columns"""
+        rows = [catalogue.slot == SLOT_CODES[slot] for slot in SLOTS]
+        rows += [(catalogue.diets & DIET_BITS[tag]) != 0 for tag in DIET_TAGS]
+        rows += [(catalogue.allergens & ALLERGEN_BITS[allergen]) != 0 for allergen in ALLERGENS]
+        return cls(np.stack([pack_mask(mask) for mask in rows]), catalogue_fingerprint(catalogue))
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "RecipeIndex":
+        """Open an index written by save(), memory-mapped read-only by default"""
+        fingerprint = None
+        if os.path.exists(fingerprint_path(path)):
+            with open(fingerprint_path(path), encoding="utf-8") as handle:
+                fingerprint = handle.read().strip() or None
+        return cls(np.load(path, mmap_mode="r" if mmap else None), fingerprint)
+
+    @classmethod
+    def for_catalogue(cls, catalogue: RecipeCatalogue, path: str = None) -> "RecipeIndex":
+        """Index for a catalogue: mapped from `path` when its fingerprint matches, else built (and saved there)"""
+        fingerprint = catalogue_fingerprint(catalogue)
+        if path and os.path.exists(path):
+            index = cls.load(path)
+            if index.fingerprint == fingerprint and index.size == len(catalogue):
+                return index
+        index = cls.from_catalogue(catalogue)
+        if path:
+            index.save(path)
+        return index
+
+    def save(self, path: str):
+        """Write the bitsets as a .npy file that load() can memory-map, plus the catalogue fingerprint
+
+        The old fingerprint is removed first, so a half-written save is rebuilt
+        rather than trusted.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(fingerprint_path(path)):
+            os.remove(fingerprint_path(path))
+        with open(path, "wb") as output:
+            np.save(output, np.ascontiguousarray(self.bits, dtype="<u8"))
+        if self.fingerprint:
+            with open(fingerprint_path(path), "w", encoding="utf-8") as output:
+                output.write(self.fingerprint)
+
+    def bitset(self, tag: str) -> Any:
+        """The bitset of one tag"""
+        row = TAG_ROWS.get(tag)
+        if row is None:
+            raise ValueError(f"Unknown recipe tag: {tag}")
+        return self.bits[row]
+
+    def query(self, all_of: Sequence[str] = (), none_of: Sequence[str] = ()) -> Any:
+        """Bitset of recipes carrying every tag in all_of and none in none_of"""
+        result = self.everything.copy()
+        for tag in all_of:
+            np.bitwise_and(result, self.bitset(tag), out=result)
+        for tag in none_of:
+            result &= ~self.bitset(tag)
+        return result
+
+    @staticmethod
+    def rows(bitset: Any) -> Any:
+        """Catalogue row positions of the recipes in a bitset"""
+        return np.flatnonzero(np.unpackbits(bitset.view(np.uint8), bitorder="little"))
+
+    @staticmethod
+    def count(bitset: Any) -> int:
+        """Number of recipes in a bitset"""
+        return int(np.unpackbits(bitset.view(np.uint8)).sum())
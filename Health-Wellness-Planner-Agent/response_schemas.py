@@ -0,0 +1,302 @@
+"""
+Output schemas per response_type, compiled once and checked in guardrails
+"""
+import itertools
+import os
+import threading
+from typing import Any, Dict, Optional, Sequence
+from typing_extensions import NotRequired, TypedDict
+from hooks import hook_manager
+from utils.counters import ShardedCounters
+
+# --- Shared pieces ---
+
+class Recommendation(TypedDict):
+    category: str
+    priority: str
+    recommendation: str
+    reason: str
+
+class CheckinDate(TypedDict):
+    date: str
+    day: str
+
+# --- Content per response_type ---
+
+class GoalData(TypedDict):
+    quantity: Optional[float]
+    metric: str
+    duration: str
+    goal_type: str
+    original_text: str
+    quantity_kg: NotRequired[Optional[float]]
+    duration_days: NotRequired[Optional[int]]
+
+class GoalAnalysisContent(TypedDict):
+    message: str
+    goal_data: GoalData
+    feasibility: str
+    recommendations: Sequence[str]
+
+class Macros(TypedDict):
+    protein_g: float
+    carbs_g: float
+    fat_g: float
+
+class DayMeals(TypedDict):
+    day: str
+    meals: Dict[str, str]
+    calories: int
+    servings: NotRequired[Dict[str, float]]
+    recipe_ids: NotRequired[Dict[str, int]]
+    macros: NotRequired[Macros]
+
+class MacroTargets(Macros):
+    calories: float
+
+class GlycemicDay(TypedDict):
+    day: str
+    meals: Dict[str, float]
+    total: float
+    carbs_g: float
+    total_after_swaps: NotRequired[float]
+
+class GlycemicSwap(TypedDict):
+    day: str
+    slot: str
+    current: str
+    replacement: str
+    recipe_id: int
+    servings: float
+    glycemic_load_before: float
+    glycemic_load_after: float
+
+class GlycemicAnalysis(TypedDict):
+    target: float
+    weekly_average: float
+    days_over_target: Sequence[str]
+    days: Sequence[GlycemicDay]
+    swaps: Sequence[GlycemicSwap]
+
+class MealPlanContent(TypedDict):
+    dietary_type: str
+    daily_plans: Sequence[DayMeals]
+    targets: NotRequired[MacroTargets]
+    excluded_allergens: NotRequired[Sequence[str]]
+    glycemic_analysis: NotRequired[GlycemicAnalysis]
+    tips: Sequence[str]
+
+class Prescription(TypedDict):
+    exercise: str
+    sets: int
+    reps: int
+    load_pct: int
+
+class WorkoutDay(TypedDict):
+    """Strength days list focus and exercises, cardio days an activity"""
+    day: str
+    focus: NotRequired[str]
+    exercises: NotRequired[Sequence[str]]
+    prescriptions: NotRequired[Sequence[Prescription]]
+    activity: NotRequired[str]
+    duration: NotRequired[str]
+    notes: NotRequired[str]
+
+class ProgrammeDescriptor(TypedDict):
+    workout_type: str
+    experience_level: str
+    weeks: int
+    seed: int
+    current_week: int
+
+class ProgrammeWeek(TypedDict):
+    week: int
+    block: int
+    phase: str
+    days: Sequence[WorkoutDay]
+
+class WorkoutPlanContent(TypedDict):
+    workout_type: str
+    experience_level: str
+    weekly_plan: Sequence[WorkoutDay]
+    safety_tips: Sequence[str]
+    avoided_patterns: NotRequired[Sequence[str]]
+    programme: NotRequired[ProgrammeDescriptor]
+    current_week: NotRequired[ProgrammeWeek]
+
+class ProgressData(TypedDict):
+    timestamp: str
+    notes: str
+    metrics: Dict[str, float]
+
+class ProgressAnalysis(TypedDict):
+    overall_score: int
+    insights: Sequence[str]
+    weight_change: NotRequired[float]
+
+class ProgressUpdateContent(TypedDict):
+    message: str
+    progress_data: ProgressData
+    analysis: ProgressAnalysis
+    recommendations: Sequence[str]
+
+class Schedule(TypedDict):
+    frequency_days: int
+    next_checkin: CheckinDate
+    upcoming_checkins: Sequence[CheckinDate]
+    questions: Sequence[str]
+
+class ScheduleContent(TypedDict):
+    message: str
+    schedule: Schedule
+    next_checkin: CheckinDate
+
+class UserSummary(TypedDict):
+    user_name: str
+    primary_goal: Optional[Dict[str, Any]]
+    dietary_preferences: Optional[str]
+    workout_plan: Optional[Dict[str, Any]]
+    progress_entries: int
+
+class EscalationContent(TypedDict):
+    message: str
+    escalation_reason: str
+    user_summary: UserSummary
+    next_steps: Sequence[str]
+    estimated_wait_time: str
+
+class Resource(TypedDict):
+    title: str
+    type: str
+    description: str
+
+class NutritionConsultationContent(TypedDict):
+    message: str
+    consultation_type: str
+    recommendations: Sequence[Recommendation]
+    important_notes: Sequence[str]
+    resources: Sequence[Resource]
+    allergies: NotRequired[Sequence[str]]
+    meal_plan: NotRequired[MealPlanContent]
+    glycemic_analysis: NotRequired[GlycemicAnalysis]
+
+class InjuryAnalysis(TypedDict):
+    injury_type: str
+    severity: str
+    affected_areas: Sequence[str]
+    safe_movements: Sequence[str]
+    avoid_movements: Sequence[str]
+    avoid_patterns: NotRequired[Sequence[str]]
+
+class ModifiedWorkoutPlan(TypedDict):
+    weekly_plan: Sequence[WorkoutDay]
+
+class InjuryConsultationContent(TypedDict):
+    message: str
+    injury_type: str
+    injury_analysis: InjuryAnalysis
+    recommendations: Sequence[Recommendation]
+    modified_workout_plan: ModifiedWorkoutPlan
+    safety_guidelines: Sequence[str]
+
+class ErrorContent(TypedDict):
+    error: str
+
+CONTENT_SCHEMAS = {
+    'goal_analysis': GoalAnalysisContent,
+    'meal_plan': MealPlanContent,
+    'workout_plan': WorkoutPlanContent,
+    'progress_update': ProgressUpdateContent,
+    'schedule': ScheduleContent,
+    'escalation': EscalationContent,
+    'nutrition_consultation': NutritionConsultationContent,
+    'injury_consultation': InjuryConsultationContent,
+    'error': ErrorContent
+}
+
+class OutputValidationError(ValueError):
+    """A response does not match the schema for its response_type"""
+
+class ResponseSchemaRegistry:
+    """Validators per response_type, each compiled on first use
+
+    Modes (OUTPUT_VALIDATION): "strict" validates every response and raises
+    OutputValidationError; "sampled" (default) validates 1 in
+    OUTPUT_VALIDATION_SAMPLE_RATE responses and only counts and reports
+    violations; "off" skips validation. Unknown response types pass.
+    """
+
+    MODES = ("off", "sampled", "strict")
+
+    def __init__(self, schemas: Dict[str, Any] = None, mode: str = "sampled", sample_every: int = 100):
+        self.schemas = dict(CONTENT_SCHEMAS if schemas is None else schemas)
+        self.set_mode(mode, sample_every)
+        self._adapters: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+        self.counters = ShardedCounters()
+
+    def set_mode(self, mode: str, sample_every: int = None):
+        """Switch between off, sampled and strict validation"""
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown output validation mode: {mode}")
+        self.mode = mode
+        if sample_every is not None:
+            self.sample_every = max(1, int(sample_every))
+
+    def register(self, response_type: str, content_schema: Any):
+        """Add or replace the content schema of a response type"""
+        with self._lock:
+            self.schemas[response_type] = content_schema
+            self._adapters.pop(response_type, None)
+
+    def adapter(self, response_type: str):
+        """Compiled TypeAdapter for a response type, or None when it has no schema"""
+        adapter = self._adapters.get(response_type)
+        if adapter is None and response_type in self.schemas:
+            from pydantic import TypeAdapter
+            with self._lock:
+                adapter = self._adapters.get(response_type)
+                if adapter is None:
+                    adapter = self._adapters[response_type] = TypeAdapter(self.schemas[response_type])
+        return adapter
+
+    def check(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate a response according to the current mode; returns it unchanged"""
+        if self.mode == "off":
+            return response
+        if self.mode == "sampled" and next(self._sequence) % self.sample_every:
+            return response
+
+        response_type = response.get('response_type')
+        adapter = self.adapter(response_type)
+        if adapter is None:
+            return response
+
+        from pydantic import ValidationError
+        self.counters.add('checked')
+        try:
+            adapter.validate_python(response.get('content'))
+        except ValidationError as e:
+            self.counters.add('violations')
+            errors = [f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors(include_url=False)]
+            if self.mode == "strict":
+                raise OutputValidationError(f"Invalid {response_type} response: {'; '.join(errors[:5])}") from e
+            hook_manager.emit('schema_violation', response_type, errors[:5])
+        return response
+
+    def get_stats(self) -> Dict[str, Any]:
+        counts = self.counters.merged()
+        return {
+            'mode': self.mode,
+            'checked': counts.get('checked', 0),
+            'violations': counts.get('violations', 0),
+            'sample_every': self.sample_every
+        }
+
+# Global schema registry
+response_schemas = ResponseSchemaRegistry(
+    mode=os.getenv("OUTPUT_VALIDATION", "sampled"),
+    sample_every=int(os.getenv("OUTPUT_VALIDATION_SAMPLE_RATE", "100"))
+)
+hook_manager.register_metrics_source('output_validation', response_schemas.get_stats)
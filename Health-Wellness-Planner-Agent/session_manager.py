@@ -0,0 +1,103 @@
+"""
+Thread-safe multi-tenant session manager
+"""
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+from context import RunContextWrapper, UserSessionContext
+from hooks import hook_manager
+from utils.locks import StripedLock, session_locks
+
+class SessionManager:
+    """Hands out session contexts by uid, guarded by striped locks
+
+    Each uid maps to one lock stripe, shared with UserSessionContext's own
+    mutation methods, so work for one user is serialized while unrelated users
+    proceed in parallel. With a repository attached, sessions are loaded from
+    and queued back to it.
+    """
+
+    def __init__(self, repository: Any = None, locks: StripedLock = session_locks):
+        self.repository = repository
+        self.locks = locks
+        self._sessions: Dict[int, RunContextWrapper] = {}
+
+    def lock_for(self, uid: int):
+        """Get the lock stripe guarding a uid"""
+        return self.locks.for_key(uid)
+
+    def get(self, uid: int) -> RunContextWrapper:
+        """Get the context wrapper for a uid, creating it on first use"""
+        wrapper = self._sessions.get(uid)
+        if wrapper is not None:
+            return wrapper
+
+        with self.lock_for(uid):
+            wrapper = self._sessions.get(uid)
+            if wrapper is None:
+                if self.repository is not None:
+                    context = self.repository.get(uid)
+                else:
+                    context = UserSessionContext(uid=uid)
+                wrapper = self._sessions[uid] = RunContextWrapper(context)
+            return wrapper
+
+    @contextmanager
+    def session(self, uid: int) -> Iterator[RunContextWrapper]:
+        """Hold a user's lock for a multi-step critical section"""
+        with self.lock_for(uid):
+            yield self.get(uid)
+
+    def update(self, uid: int, **fields):
+        """Atomically update several fields of a user's context"""
+        with self.lock_for(uid):
+            wrapper = self.get(uid)
+            wrapper.update_context(**fields)
+            if self.repository is not None:
+                self.repository.save(wrapper.get_context())
+
+    def save(self, uid: int):
+        """Queue a user's context for persistence"""
+        if self.repository is not None:
+            self.repository.save(self.get(uid).get_context())
+
+    def release(self, uid: int):
+        """Forget an in-memory session, saving it first when persisted
+
+        An unpersisted session ends here, so its log segment files go with it.
+        """
+        with self.lock_for(uid):
+            wrapper = self._sessions.pop(uid, None)
+            if wrapper is not None:
+                if self.repository is not None:
+                    self.repository.save(wrapper.get_context())
+                else:
+                    wrapper.get_context().clear_logs()
+
+    def retarget_all(self) -> Dict[str, Any]:
+        """Recompute every active user's calorie target from their latest weigh-in in one vectorised pass"""
+        from nutrition.energy import retarget
+
+        wrappers = list(self._sessions.values())
+        contexts = [wrapper.get_context() for wrapper in wrappers]
+        # Hold every user's lock from reading the weigh-ins to writing the targets back,
+        # so a concurrent request can't change a profile in between and be overwritten
+        with self.locks.holding(context.uid for context in contexts):
+            targets = retarget(contexts)
+        if self.repository is not None:
+            for wrapper in wrappers:
+                self.repository.save(wrapper.get_context())
+        return targets
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get session counts"""
+        return {
+            'active_sessions': len(self._sessions),
+            'lock_stripes': len(self.locks)
+        }
+
+# Global session manager
+session_manager = SessionManager()
+hook_manager.register_metrics_source('session_manager', session_manager.get_stats)
@@ -0,0 +1,255 @@
+"""
+SQLite-backed session repository with write-behind persistence
+"""
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Tuple
+from context import UserSessionContext
+from hooks import hook_manager
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sessions", "sessions.db")
+
+class SessionRepository:
+    """Stores UserSessionContext by uid in a local SQLite file
+
+    Reads go through an in-process LRU cache. save() only marks a session dirty;
+    a background thread serializes and writes dirty sessions in one batched
+    transaction every flush_interval seconds, so chat turns never wait on disk.
+    The database runs in WAL mode so several worker processes can share it.
+    """
+
+    def __init__(self, db_path: str = None, pool_size: int = 4, flush_interval: float = 2.0,
+                 cache_size: int = 1024, cache_ttl: float = 30.0):
+        self.db_path = db_path or os.getenv("SESSION_DB_PATH", DEFAULT_DB_PATH)
+        self.flush_interval = flush_interval
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+
+        directory = os.path.dirname(os.path.abspath(self.db_path))
+        os.makedirs(directory, exist_ok=True)
+
+        # Connection pool
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(pool_size):
+            self._pool.put(self._connect())
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "uid INTEGER PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+        # Read-through cache: uid -> (context, loaded_at)
+        self._cache: "OrderedDict[int, Tuple[UserSessionContext, float]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        # Write-behind queue: uid -> latest context to persist
+        self._dirty: Dict[int, UserSessionContext] = {}
+        # The batch being written; its sessions still count as unsaved until the commit
+        self._flushing: Dict[int, UserSessionContext] = {}
+        self._dirty_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+        # Counters are bumped from callers and the flusher thread alike
+        self.stats = {'reads': 0, 'cache_hits': 0, 'writes': 0, 'flushes': 0, 'flush_errors': 0}
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="session-flusher", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a pooled connection"""
+        connection = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection from the pool"""
+        connection = self._pool.get()
+        try:
+            yield connection
+        finally:
+            self._pool.put(connection)
+
+    def get(self, uid: int) -> UserSessionContext:
+        """Get a session, loading it from disk or creating it on a cache miss
+
+        A cached session is always returned as the same live object: once its
+        TTL runs out it is refreshed from disk in place, under the user's lock,
+        so callers still holding it never write to a detached copy. Sessions
+        that are dirty or being flushed are newer than their row and are
+        returned without reading it.
+        """
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._cache.get(uid)
+            if cached is not None and now - cached[1] < self.cache_ttl:
+                self._cache.move_to_end(uid)
+                self._count('cache_hits')
+                return cached[0]
+
+        pending = self._pending(uid)
+        if pending is not None:
+            self._count('cache_hits')
+            self._remember(uid, pending, now)
+            return pending
+
+        if cached is not None:
+            context = cached[0]
+            with context.lock:
+                if self._pending(uid) is None:
+                    row = self._read(uid)
+                    if row is not None:
+                        stored = UserSessionContext.model_validate_json(row[0])
+                        context.update_context(**{field: getattr(stored, field) for field in UserSessionContext.model_fields})
+        else:
+            row = self._read(uid)
+            context = UserSessionContext.model_validate_json(row[0]) if row is not None else UserSessionContext(uid=uid)
+
+        self._remember(uid, context, now)
+        return context
+
+    def _read(self, uid: int) -> Any:
+        """Fetch a session row from disk"""
+        with self._connection() as connection:
+            row = connection.execute("SELECT data FROM sessions WHERE uid = ?", (uid,)).fetchone()
+        self._count('reads')
+        return row
+
+    def _count(self, field: str, amount: int = 1):
+        """Bump a stats counter"""
+        with self._lock:
+            self.stats[field] += amount
+
+    def _pending(self, uid: int) -> Any:
+        """The unsaved context of a uid that is queued or being flushed, else None"""
+        with self._dirty_lock:
+            context = self._dirty.get(uid)
+            return context if context is not None else self._flushing.get(uid)
+
+    def _remember(self, uid: int, context: UserSessionContext, loaded_at: float):
+        """Put a session in the read-through cache"""
+        with self._cache_lock:
+            self._cache[uid] = (context, loaded_at)
+            self._cache.move_to_end(uid)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def save(self, context: UserSessionContext):
+        """Queue a session for the next background flush"""
+        if self._closed:
+            raise RuntimeError("SessionRepository is closed")
+        with self._dirty_lock:
+            self._dirty[context.uid] = context
+        self._remember(context.uid, context, time.monotonic())
+
+    def delete(self, uid: int):
+        """Remove a session from the cache, the write queue and the database
+
+        Waits for a flush in progress, so a batch already holding the session
+        can't write it back after the row is gone. The session's log segment
+        files are removed with it.
+        """
+        with self._flush_lock:
+            with self._dirty_lock:
+                pending = self._dirty.pop(uid, None)
+            with self._cache_lock:
+                cached = self._cache.pop(uid, None)
+            row = self._read(uid)
+            with self._connection() as connection:
+                connection.execute("DELETE FROM sessions WHERE uid = ?", (uid,))
+
+        # The live session and the stored one may point at different segments
+        contexts = [pending, cached[0] if cached is not None else None]
+        if row is not None:
+            contexts.append(UserSessionContext.model_validate_json(row[0]))
+        for context in {id(context): context for context in contexts if context is not None}.values():
+            context.clear_logs()
+
+    def flush(self) -> int:
+        """Write every dirty session in one transaction; returns the number written"""
+        with self._flush_lock:
+            with self._dirty_lock:
+                dirty, self._dirty = self._dirty, {}
+                self._flushing = dirty
+            if not dirty:
+                return 0
+
+            now = time.time()
+            rows = [(uid, context.model_dump_json(), now) for uid, context in dirty.items()]
+            with self._connection() as connection:
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    connection.executemany(
+                        "INSERT INTO sessions (uid, data, updated_at) VALUES (?, ?, ?) "
+                        "ON CONFLICT(uid) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                        rows
+                    )
+                    connection.execute("COMMIT")
+                except Exception:
+                    connection.execute("ROLLBACK")
+                    # Put the batch back unless a newer save superseded it
+                    with self._dirty_lock:
+                        for uid, context in dirty.items():
+                            self._dirty.setdefault(uid, context)
+                        self._flushing = {}
+                    raise
+            with self._dirty_lock:
+                self._flushing = {}
+
+            self._count('writes', len(rows))
+            self._count('flushes')
+            return len(rows)
+
+    def _flush_loop(self):
+        """Background write-behind loop"""
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                self._count('flush_errors')
+                hook_manager.emit('session_flush_failed', type(e).__name__, str(e))
+
+    def close(self):
+        """Stop the flusher, write pending sessions and close connections"""
+        if self._closed:
+            return
+        self._closed = True
+        self._stop.set()
+        self._flusher.join()
+        self.flush()
+        while not self._pool.empty():
+            self._pool.get().close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache and write-behind counters"""
+        with self._lock:
+            stats = dict(self.stats)
+        return {
+            **stats,
+            'cached_sessions': len(self._cache),
+            'pending_writes': len(self._dirty)
+        }
+
+# Global session repository, opened on first use
+_session_repository = None
+_session_repository_lock = threading.Lock()
+
+def get_session_repository() -> SessionRepository:
+    """Get the process-wide session repository"""
+    global _session_repository
+    if _session_repository is None:
+        with _session_repository_lock:
+            if _session_repository is None:
+                _session_repository = SessionRepository()
+                hook_manager.register_metrics_source('sessions', _session_repository.get_stats)
+    return _session_repository
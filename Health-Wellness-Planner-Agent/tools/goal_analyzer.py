@@ -5,6 +5,7 @@ from typing import Dict, Any
 from context import RunContextWrapper
 from guardrails import GuardrailValidator
 from hooks import hook_manager
+from response_schemas import OutputValidationError
 
 class GoalAnalyzerTool:
     """Tool for analyzing user goals"""
@@ -45,6 +46,9 @@ class GoalAnalyzerTool:
             
             return GuardrailValidator.validate_output(response)
             
+        except OutputValidationError:
+            # Strict output validation must reach the caller, not become an error payload
+            raise
         except Exception as e:
             return {
                 "response_type": "error",
@@ -54,7 +58,9 @@ class GoalAnalyzerTool:
     def analyze_feasibility(self, goal_data: Dict[str, Any]) -> str:
         """Analyze if goal is feasible"""
         if goal_data['goal_type'] == 'weight_loss':
-            if goal_data['quantity'] and goal_data['quantity'] > 2:
+            # Compare in kg when a unit was given, so "10 lbs" and "4.5 kg" agree
+            quantity = goal_data.get('quantity_kg') or goal_data['quantity']
+            if quantity and quantity > 2:
                 return "challenging but achievable"
             else:
                 return "very achievable"
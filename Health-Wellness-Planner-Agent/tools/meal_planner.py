@@ -1,10 +1,21 @@
 """
 Meal Planner Tool
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Sequence
 from context import RunContextWrapper
 from guardrails import GuardrailValidator
 from hooks import hook_manager
+from response_schemas import OutputValidationError
+from utils.cache import cached, result_cache
+from utils.template_registry import template_registry
+from nutrition.catalogue import on_catalogue_change
+from nutrition.energy import energy_for
+from nutrition.glycemic import analyse_plan
+from nutrition.planner import get_engine, macro_targets
+
+# Cached plans are built from templates and the recipe catalogue, so drop them when either changes
+template_registry.on_reload(lambda: result_cache.invalidate("meal_planner"))
+on_catalogue_change(lambda: result_cache.invalidate("meal_planner"))
 
 class MealPlannerTool:
     """Tool for generating meal plans"""
@@ -12,24 +23,33 @@ class MealPlannerTool:
     def __init__(self):
         self.name = "meal_planner"
     
-    def generate_meal_plan(self, dietary_preferences: str, goal: Dict[str, Any], context: RunContextWrapper) -> Dict[str, Any]:
-        """Generate 7-day meal plan"""
+    def generate_meal_plan(self, dietary_preferences: str, goal: Dict[str, Any], context: RunContextWrapper,
+                           allergens: Sequence[str] = ()) -> Dict[str, Any]:
+        """Generate 7-day meal plan, avoiding the user's recorded allergies and any the message excludes"""
         hook_manager.log_tool_start(self.name)
         
         try:
-            # Validate diet type
+            # Validate diet type and allergies; exclusions from this message apply to this plan only
             diet_type = GuardrailValidator.validate_dietary_input(dietary_preferences)
+            allergies = GuardrailValidator.validate_allergens(list(context.get_context().allergies or ()) + list(allergens))
             
-            # Create meal plan
-            meal_plan = self.create_meal_plan(diet_type, goal)
+            # Create meal plan for this user's calorie target
+            calories = self.estimate_calories(goal, context.get_context())
+            meal_plan = self.create_meal_plan(diet_type, goal, allergies, calories)
             
             # Update context
             context.update_context(
                 diet_preferences=diet_type,
+                calorie_target=calories,
                 meal_plan=meal_plan["daily_plans"]
             )
             context.get_context().add_progress_log("meal_planning", f"Generated {diet_type} meal plan")
             
+            # Users flagged with diabetes get the plan's glycemic load and lower-load swaps
+            if "diabetes" in (context.get_context().health_conditions or ()):
+                glycemic_analysis = analyse_plan(meal_plan["daily_plans"], diet_type, allergies)
+                meal_plan = {**meal_plan, "glycemic_analysis": glycemic_analysis}
+            
             response = {
                 "response_type": "meal_plan",
                 "content": meal_plan
@@ -37,84 +57,45 @@ class MealPlannerTool:
             
             return GuardrailValidator.validate_output(response)
             
+        except OutputValidationError:
+            # Strict output validation must reach the caller, not become an error payload
+            raise
         except Exception as e:
             return {
                 "response_type": "error",
                 "content": {"error": str(e)}
             }
     
-    def create_meal_plan(self, diet_type: str, goal: Dict[str, Any]) -> Dict[str, Any]:
-        """Create structured meal plan"""
-        days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-        
-        # Meal templates
-        meal_templates = {
-            "vegetarian": {
-                "breakfast": ["Oatmeal with berries", "Veggie scramble", "Smoothie bowl", "Avocado toast"],
-                "lunch": ["Quinoa salad", "Vegetable soup", "Caprese sandwich", "Buddha bowl"],
-                "dinner": ["Pasta primavera", "Stuffed peppers", "Vegetable stir-fry", "Lentil curry"],
-                "snack": ["Greek yogurt", "Mixed nuts", "Fruit", "Hummus with veggies"]
-            },
-            "vegan": {
-                "breakfast": ["Chia pudding", "Smoothie bowl", "Oatmeal", "Avocado toast"],
-                "lunch": ["Quinoa bowl", "Veggie wrap", "Salad", "Soup"],
-                "dinner": ["Tofu stir-fry", "Lentil curry", "Vegetable pasta", "Buddha bowl"],
-                "snack": ["Nuts", "Fruit", "Vegetables", "Plant yogurt"]
-            },
-            "keto": {
-                "breakfast": ["Eggs and bacon", "Avocado", "Keto smoothie", "Cheese omelet"],
-                "lunch": ["Chicken salad", "Zucchini noodles", "Keto bowl", "Lettuce wraps"],
-                "dinner": ["Salmon", "Steak", "Chicken thighs", "Pork chops"],
-                "snack": ["Cheese", "Nuts", "Olives", "Fat bombs"]
-            },
-            "omnivore": {
-                "breakfast": ["Eggs", "Oatmeal", "Smoothie", "Toast"],
-                "lunch": ["Chicken salad", "Sandwich", "Soup", "Bowl"],
-                "dinner": ["Grilled chicken", "Fish", "Pasta", "Stir-fry"],
-                "snack": ["Yogurt", "Fruit", "Nuts", "Vegetables"]
-            }
-        }
-        
-        templates = meal_templates.get(diet_type, meal_templates["omnivore"])
+    def invalidate_cache(self):
+        """Drop cached meal plans, e.g. after template data changes"""
+        result_cache.invalidate(self.name)
+    
+    @cached("meal_planner", key=lambda self, diet_type, goal, allergens=(), calories=None: (
+        diet_type, (goal or {}).get("goal_type"), tuple(allergens), calories or self.estimate_calories(goal or {})
+    ))
+    def create_meal_plan(self, diet_type: str, goal: Dict[str, Any], allergens: Sequence[str] = (),
+                         calories: int = None) -> Dict[str, Any]:
+        """Create structured meal plan; calories defaults to the target for an unknown profile"""
+        goal_type = (goal or {}).get("goal_type")
+        targets = macro_targets(calories or self.estimate_calories(goal or {}), goal_type, diet_type)
         
-        daily_plans = []
-        for i, day in enumerate(days):
-            daily_plan = {
-                "day": day,
-                "meals": {
-                    "breakfast": templates["breakfast"][i % len(templates["breakfast"])],
-                    "lunch": templates["lunch"][i % len(templates["lunch"])],
-                    "dinner": templates["dinner"][i % len(templates["dinner"])],
-                    "snack": templates["snack"][i % len(templates["snack"])]
-                },
-                "calories": self.estimate_calories(goal)
-            }
-            daily_plans.append(daily_plan)
+        # Pick recipes for the week; day calories and macros are totals of the chosen servings
+        daily_plans = get_engine().plan(diet_type, targets, allergens=allergens)
         
         return {
             "dietary_type": diet_type,
             "daily_plans": daily_plans,
+            "targets": targets._asdict(),
+            "excluded_allergens": list(allergens),
             "tips": self.get_tips(diet_type)
         }
     
-    def estimate_calories(self, goal: Dict[str, Any]) -> int:
-        """Estimate daily calories"""
-        base_calories = 2000
-        
-        if goal.get("goal_type") == "weight_loss":
-            return base_calories - 300
-        elif goal.get("goal_type") == "weight_gain":
-            return base_calories + 300
-        else:
-            return base_calories
+    def estimate_calories(self, goal: Dict[str, Any], profile: Any = None) -> int:
+        """Estimate the daily calorie target from body metrics (when known) and the goal"""
+        return energy_for(profile, goal or {}).calories
     
     def get_tips(self, diet_type: str) -> List[str]:
         """Get dietary tips"""
-        tips = {
-            "vegetarian": ["Include protein with each meal", "Take B12 supplements"],
-            "vegan": ["Combine proteins", "Take B12 and D3 supplements"],
-            "keto": ["Monitor ketones", "Stay hydrated"],
-            "omnivore": ["Eat variety", "Include fruits and vegetables"]
-        }
+        tips = template_registry.get("meal_templates")["tips"]
         
         return tips.get(diet_type, ["Eat balanced meals", "Stay hydrated"])
\ No newline at end of file
@@ -4,7 +4,9 @@ Check-in Scheduler Tool
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
 from context import RunContextWrapper
+from guardrails import GuardrailValidator
 from hooks import hook_manager
+from response_schemas import OutputValidationError
 
 class CheckinSchedulerTool:
     """Tool for scheduling check-ins"""
@@ -26,7 +28,7 @@ class CheckinSchedulerTool:
             # Update context
             context.get_context().add_progress_log("scheduling", f"Scheduled {frequency} check-ins")
             
-            return {
+            response = {
                 "response_type": "schedule",
                 "content": {
                     "message": f"Great! I've scheduled {frequency} check-ins for you.",
@@ -35,6 +37,11 @@ class CheckinSchedulerTool:
                 }
             }
             
+            return GuardrailValidator.validate_output(response)
+            
+        except OutputValidationError:
+            # Strict output validation must reach the caller, not become an error payload
+            raise
         except Exception as e:
             return {
                 "response_type": "error",
@@ -4,7 +4,9 @@ Progress Tracker Tool
 from typing import Dict, Any, List
 from datetime import datetime
 from context import RunContextWrapper
+from guardrails import GuardrailValidator
 from hooks import hook_manager
+from response_schemas import OutputValidationError
 
 class ProgressTrackerTool:
     """Tool for tracking progress"""
@@ -26,7 +28,7 @@ class ProgressTrackerTool:
             # Analyze progress
             analysis = self.analyze_progress(validated_data, context)
             
-            return {
+            response = {
                 "response_type": "progress_update",
                 "content": {
                     "message": "Progress updated successfully!",
@@ -36,6 +38,11 @@ class ProgressTrackerTool:
                 }
             }
             
+            return GuardrailValidator.validate_output(response)
+            
+        except OutputValidationError:
+            # Strict output validation must reach the caller, not become an error payload
+            raise
         except Exception as e:
             return {
                 "response_type": "error",
@@ -61,8 +68,25 @@ class ProgressTrackerTool:
     
     def update_context_with_progress(self, progress_data: Dict[str, Any], context: RunContextWrapper):
         """Update context with progress"""
-        import json
-        context.get_context().add_progress_log("progress_update", json.dumps(progress_data))
+        metrics = progress_data.get("metrics", {})
+        user_context = context.get_context()
+        
+        # Numbers go to the typed columns; the log keeps a readable summary
+        user_context.progress_metrics.append(
+            "progress_update",
+            weight=metrics.get("weight"),
+            workouts_completed=metrics.get("workouts_completed")
+        )
+        user_context.add_progress_log("progress_update", self.summarize_metrics(metrics))
+    
+    def summarize_metrics(self, metrics: Dict[str, Any]) -> str:
+        """Summarize recorded metrics for the progress log"""
+        parts = []
+        if "weight" in metrics:
+            parts.append(f"weight {metrics['weight']}")
+        if "workouts_completed" in metrics:
+            parts.append(f"{metrics['workouts_completed']} workouts completed")
+        return "Recorded " + ", ".join(parts) if parts else "Recorded progress notes"
     
     def analyze_progress(self, progress_data: Dict[str, Any], context: RunContextWrapper) -> Dict[str, Any]:
         """Analyze progress"""
@@ -80,6 +104,12 @@ class ProgressTrackerTool:
         else:
             analysis["insights"].append("Let's work on getting more workouts in.")
         
+        # Analyze weight trend across all recorded entries
+        weight_change = context.get_context().progress_metrics.weight_change()
+        if weight_change is not None:
+            analysis["weight_change"] = round(weight_change, 1)
+            analysis["insights"].append(f"Weight change since your first check-in: {weight_change:+.1f}")
+        
         return analysis
     
     def generate_recommendations(self, analysis: Dict[str, Any]) -> List[str]:
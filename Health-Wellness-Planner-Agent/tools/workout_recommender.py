@@ -1,10 +1,19 @@
 """
 Workout Recommender Tool
 """
-from typing import Dict, Any, List
+import re
+from typing import Dict, Any, List, Optional, Sequence
 from context import RunContextWrapper
 from guardrails import GuardrailValidator
 from hooks import hook_manager
+from response_schemas import OutputValidationError
+from utils.cache import cached, result_cache
+from utils.template_registry import template_registry
+from fitness.exercise_library import contraindications, get_library
+from fitness.periodisation import DEFAULT_WEEKS, Programme, materialise, new_programme
+
+# Cached plans are built from templates, so drop them when templates change
+template_registry.on_reload(lambda: result_cache.invalidate("workout_recommender"))
 
 class WorkoutRecommenderTool:
     """Tool for recommending workout plans"""
@@ -19,9 +28,31 @@ class WorkoutRecommenderTool:
         try:
             # Parse preferences
             workout_prefs = self.parse_preferences(preferences)
+            current_plan = context.get_context().workout_plan or {}
+            
+            # A week of the current programme ("show week 5 of my workout") is built on request,
+            # alongside a base plan re-derived for the user's current injuries
+            if "week" in workout_prefs and current_plan.get("programme"):
+                week = self.programme_weeks(context, start=workout_prefs["week"])[0]
+                programme_plan = self.programme_plan(context)
+                response = {
+                    "response_type": "workout_plan",
+                    "content": dict(programme_plan, programme=current_plan["programme"], current_week=week)
+                }
+                return GuardrailValidator.validate_output(response)
+            
+            # Create workout plan, steering clear of movements the user's injury rules out
+            avoid = contraindications(context.get_context().injury_notes)
+            workout_plan = self.create_workout_plan(workout_prefs, goal, avoid)
+            content = workout_plan
             
-            # Create workout plan
-            workout_plan = self.create_workout_plan(workout_prefs, goal)
+            # Multi-week programme: the context keeps only its descriptor, the response its first week
+            if "weeks" in workout_prefs:
+                programme = new_programme(workout_plan["workout_type"], workout_plan["experience_level"],
+                                          workout_prefs["weeks"])
+                workout_plan = dict(workout_plan, programme=programme.to_dict())
+                first_week = materialise(programme, workout_plan["weekly_plan"], avoid=avoid)[0]
+                content = dict(workout_plan, current_week=first_week)
             
             # Update context
             context.update_context(workout_plan=workout_plan)
@@ -29,11 +60,14 @@ class WorkoutRecommenderTool:
             
             response = {
                 "response_type": "workout_plan",
-                "content": workout_plan
+                "content": content
             }
             
             return GuardrailValidator.validate_output(response)
             
+        except OutputValidationError:
+            # Strict output validation must reach the caller, not become an error payload
+            raise
         except Exception as e:
             return {
                 "response_type": "error",
@@ -55,64 +89,73 @@ class WorkoutRecommenderTool:
         if "cardio" in preferences.lower():
             prefs["workout_type"] = "cardio"
         
+        # "week 5" asks for a week of the current programme; "12 week program" starts a new one
+        match = re.search(r"\bweek\s+(\d+)", preferences.lower())
+        if match:
+            prefs["week"] = int(match.group(1))
+        else:
+            match = re.search(r"(\d+)[\s-]*weeks?\b", preferences.lower())
+            if match:
+                prefs["weeks"] = int(match.group(1))
+            elif any(word in preferences.lower() for word in ["programme", "program"]):
+                prefs["weeks"] = DEFAULT_WEEKS
+        
         return prefs
     
-    def create_workout_plan(self, prefs: Dict[str, Any], goal: Dict[str, Any]) -> Dict[str, Any]:
-        """Create workout plan"""
-        
-        # Workout templates
-        strength_workouts = {
-            "beginner": [
-                {"day": "Monday", "focus": "Upper Body", "exercises": ["Push-ups", "Pull-ups", "Shoulder Press"], "duration": "30 minutes"},
-                {"day": "Wednesday", "focus": "Lower Body", "exercises": ["Squats", "Lunges", "Calf Raises"], "duration": "30 minutes"},
-                {"day": "Friday", "focus": "Full Body", "exercises": ["Burpees", "Planks", "Mountain Climbers"], "duration": "30 minutes"}
-            ],
-            "intermediate": [
-                {"day": "Monday", "focus": "Chest & Triceps", "exercises": ["Bench Press", "Dips", "Tricep Extensions"], "duration": "45 minutes"},
-                {"day": "Tuesday", "focus": "Back & Biceps", "exercises": ["Rows", "Pull-ups", "Bicep Curls"], "duration": "45 minutes"},
-                {"day": "Thursday", "focus": "Legs", "exercises": ["Squats", "Deadlifts", "Lunges"], "duration": "45 minutes"},
-                {"day": "Friday", "focus": "Shoulders", "exercises": ["Shoulder Press", "Lateral Raises", "Shrugs"], "duration": "45 minutes"}
-            ],
-            "advanced": [
-                {"day": "Monday", "focus": "Chest", "exercises": ["Bench Press", "Incline Press", "Flyes"], "duration": "60 minutes"},
-                {"day": "Tuesday", "focus": "Back", "exercises": ["Deadlifts", "Rows", "Pull-ups"], "duration": "60 minutes"},
-                {"day": "Wednesday", "focus": "Legs", "exercises": ["Squats", "Romanian Deadlifts", "Leg Press"], "duration": "60 minutes"},
-                {"day": "Thursday", "focus": "Shoulders", "exercises": ["Military Press", "Lateral Raises", "Rear Delts"], "duration": "60 minutes"},
-                {"day": "Friday", "focus": "Arms", "exercises": ["Close-Grip Bench", "Tricep Dips", "Bicep Curls"], "duration": "60 minutes"}
-            ]
-        }
+    def programme_plan(self, context: RunContextWrapper) -> Dict[str, Any]:
+        """Single-week plan the user's programme builds on, adapted to their current injury notes"""
+        programme = Programme.from_value(context.get_context().workout_plan["programme"])
+        avoid = contraindications(context.get_context().injury_notes)
+        prefs = {"workout_type": programme.workout_type, "experience_level": programme.experience_level}
+        return self.create_workout_plan(prefs, {}, avoid)
+    
+    def programme_weeks(self, context: RunContextWrapper, start: int = None, count: int = 1) -> List[Dict[str, Any]]:
+        """Materialise `count` weeks of the user's programme from `start` (default: its current week)"""
+        user_context = context.get_context()
+        programme = (user_context.workout_plan or {}).get("programme")
+        if not programme:
+            return []
+        programme = Programme.from_value(programme)
+        start = min(max(start or programme.current_week, 1), programme.weeks)
+        avoid = contraindications(user_context.injury_notes)
+        base_week = self.programme_plan(context)["weekly_plan"]
+        return materialise(programme, base_week, start, count, avoid)
+    
+    def advance_programme(self, context: RunContextWrapper) -> Optional[Dict[str, Any]]:
+        """Move the user's programme on to its next week and return that week (None once finished)"""
+        workout_plan = context.get_context().workout_plan or {}
+        if not workout_plan.get("programme"):
+            return None
+        programme = Programme.from_value(workout_plan["programme"])
+        if programme.current_week >= programme.weeks:
+            return None
+        programme = programme._replace(current_week=programme.current_week + 1)
+        context.update_context(workout_plan=dict(workout_plan, programme=programme.to_dict()))
+        context.get_context().add_progress_log("workout_planning", f"Started week {programme.current_week} of {programme.weeks}")
+        return self.programme_weeks(context)[0]
+    
+    def invalidate_cache(self):
+        """Drop cached workout plans, e.g. after template data changes"""
+        result_cache.invalidate(self.name)
+    
+    @cached("workout_recommender",
+            key=lambda self, prefs, goal, avoid=(): (prefs.get("workout_type", "strength"),
+                                                     prefs.get("experience_level", "beginner"), tuple(avoid)))
+    def create_workout_plan(self, prefs: Dict[str, Any], goal: Dict[str, Any], avoid: Sequence[str] = ()) -> Dict[str, Any]:
+        """Create workout plan, swapping out exercises with any of the `avoid` movement patterns"""
         
-        cardio_workouts = {
-            "beginner": [
-                {"day": "Monday", "activity": "Walking", "duration": "20 minutes"},
-                {"day": "Wednesday", "activity": "Cycling", "duration": "15 minutes"},
-                {"day": "Friday", "activity": "Swimming", "duration": "15 minutes"}
-            ],
-            "intermediate": [
-                {"day": "Monday", "activity": "Running", "duration": "30 minutes"},
-                {"day": "Tuesday", "activity": "HIIT", "duration": "25 minutes"},
-                {"day": "Thursday", "activity": "Cycling", "duration": "35 minutes"},
-                {"day": "Saturday", "activity": "Long Walk", "duration": "45 minutes"}
-            ],
-            "advanced": [
-                {"day": "Monday", "activity": "Interval Running", "duration": "40 minutes"},
-                {"day": "Tuesday", "activity": "HIIT Circuit", "duration": "30 minutes"},
-                {"day": "Wednesday", "activity": "Cycling", "duration": "50 minutes"},
-                {"day": "Thursday", "activity": "Swimming", "duration": "40 minutes"},
-                {"day": "Saturday", "activity": "Long Run", "duration": "60 minutes"}
-            ]
-        }
+        workout_templates = template_registry.get("workout_templates")
         
         # Select appropriate plan
         workout_type = prefs.get("workout_type", "strength")
         experience = prefs.get("experience_level", "beginner")
         
         if workout_type == "cardio":
-            weekly_plan = cardio_workouts[experience]
+            weekly_plan = workout_templates["cardio"][experience]
         else:
-            weekly_plan = strength_workouts[experience]
+            weekly_plan = workout_templates["strength"][experience]
         
-        return {
+        plan = {
             "workout_type": workout_type,
             "experience_level": experience,
             "weekly_plan": weekly_plan,
@@ -122,4 +165,14 @@ class WorkoutRecommenderTool:
                 "Listen to your body",
                 "Use proper form"
             ]
-        }
\ No newline at end of file
+        }
+        
+        # Injury-safe variant: contraindicated exercises swapped through the exercise library
+        if avoid:
+            plan["weekly_plan"] = get_library().adapt_plan(weekly_plan, avoid)
+            plan["avoided_patterns"] = list(avoid)
+            plan["safety_tips"].append(
+                f"Adapted around your injury: no {', '.join(pattern.replace('_', ' ') for pattern in avoid)}"
+            )
+        
+        return plan
\ No newline at end of file
@@ -0,0 +1,86 @@
+"""
+Shared LRU cache for deterministic tool outputs
+"""
+import functools
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+from hooks import hook_manager
+from utils.frozen import deep_freeze
+
+class ResultCache:
+    """Size-bounded LRU cache holding frozen payloads, partitioned by namespace"""
+    
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, Hashable], Any]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+    
+    def _count(self, namespace: str, event: str):
+        """Bump a per-namespace counter (caller holds the lock)"""
+        stats = self._stats.get(namespace)
+        if stats is None:
+            stats = self._stats[namespace] = {'hits': 0, 'misses': 0, 'evictions': 0}
+        stats[event] += 1
+    
+    def get(self, namespace: str, key: Hashable) -> Tuple[bool, Any]:
+        """Look up an entry, returning (found, value)"""
+        with self._lock:
+            try:
+                value = self._entries[(namespace, key)]
+            except KeyError:
+                self._count(namespace, 'misses')
+                return False, None
+            self._entries.move_to_end((namespace, key))
+            self._count(namespace, 'hits')
+            return True, value
+    
+    def put(self, namespace: str, key: Hashable, value: Any) -> Any:
+        """Freeze and store an entry, evicting the least recently used ones"""
+        frozen = deep_freeze(value)
+        with self._lock:
+            self._entries[(namespace, key)] = frozen
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                (evicted_namespace, _key), _value = self._entries.popitem(last=False)
+                self._count(evicted_namespace, 'evictions')
+        return frozen
+    
+    def invalidate(self, namespace: str = None):
+        """Drop every entry of a namespace, or the whole cache"""
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+                return
+            for entry_key in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[entry_key]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss/eviction counters per namespace"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'namespaces': {name: dict(stats) for name, stats in self._stats.items()}
+            }
+
+def cached(namespace: str, key: Callable[..., Hashable]):
+    """Memoize a deterministic function; key receives the same arguments"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_key = key(*args, **kwargs)
+            found, value = result_cache.get(namespace, cache_key)
+            if found:
+                return value
+            return result_cache.put(namespace, cache_key, func(*args, **kwargs))
+        
+        wrapper.cache_namespace = namespace
+        return wrapper
+    return decorator
+
+# Global result cache
+result_cache = ResultCache(max_entries=int(os.getenv("RESULT_CACHE_SIZE", "1024")))
+hook_manager.register_metrics_source('cache', result_cache.get_stats)
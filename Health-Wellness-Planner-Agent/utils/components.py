@@ -0,0 +1,67 @@
+"""
+Lazy registry for tools and specialist agents
+"""
+import importlib
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Mapping
+
+# Component name -> "module:Class", imported and constructed on first use
+TOOL_SPECS = {
+    'goal_analyzer': 'tools.goal_analyzer:GoalAnalyzerTool',
+    'meal_planner': 'tools.meal_planner:MealPlannerTool',
+    'workout_recommender': 'tools.workout_recommender:WorkoutRecommenderTool',
+    'checkin_scheduler': 'tools.scheduler:CheckinSchedulerTool',
+    'progress_tracker': 'tools.tracker:ProgressTrackerTool'
+}
+
+AGENT_SPECS = {
+    'escalation_agent': 'agents.escalation_agent:EscalationAgent',
+    'nutrition_expert_agent': 'agents.nutrition_expert_agent:NutritionExpertAgent',
+    'injury_support_agent': 'agents.injury_support_agent:InjurySupportAgent'
+}
+
+class ComponentRegistry(Mapping):
+    """Read-only mapping that imports and builds each component on first access"""
+
+    def __init__(self, specs: Dict[str, str]):
+        self.specs = dict(specs)
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.load_times: Dict[str, float] = {}
+
+    def __getitem__(self, name: str) -> Any:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        spec = self.specs[name]
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                start = time.perf_counter()
+                module_name, class_name = spec.split(':')
+                component_class = getattr(importlib.import_module(module_name), class_name)
+                instance = self._instances[name] = component_class()
+                self.load_times[name] = time.perf_counter() - start
+            return instance
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.specs)
+
+    def __len__(self) -> int:
+        return len(self.specs)
+
+    def register(self, name: str, spec: str):
+        """Add or replace a component spec, dropping any built instance"""
+        with self._lock:
+            self.specs[name] = spec
+            self._instances.pop(name, None)
+
+    def loaded(self) -> List[str]:
+        """Names of components that have been built so far"""
+        return list(self._instances)
+
+# Process-wide registries; tools and agents are stateless, so sessions share them
+tool_registry = ComponentRegistry(TOOL_SPECS)
+agent_registry = ComponentRegistry(AGENT_SPECS)
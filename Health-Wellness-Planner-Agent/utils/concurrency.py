@@ -0,0 +1,55 @@
+"""
+Concurrency helpers for the async agent path
+"""
+import contextvars
+from typing import Any, Callable
+
+# asyncio is imported inside the functions below: it is costly to import and
+# only the async path needs it
+
+async def run_sync(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking callable in a worker thread so the event loop stays free"""
+    import asyncio
+    return await asyncio.to_thread(func, *args, **kwargs)
+
+class ConcurrencyLimiter:
+    """Bounded limiter for concurrent async requests
+
+    The bound applies per event loop, not per process: the semaphore belongs
+    to the loop that last entered the limiter, and a different loop entering
+    starts a fresh one with all max_concurrency slots free.
+    """
+
+    def __init__(self, max_concurrency: int = 100):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.active = 0
+        self._loop = None
+        self._semaphore = None
+        # Semaphores this task acquired, innermost last, so each exit releases its own
+        # even if another loop has since replaced self._semaphore
+        self._held = contextvars.ContextVar(f"limiter_held_{id(self)}", default=())
+
+    def _get_semaphore(self):
+        """Get the semaphore for the running loop, creating it on first use"""
+        import asyncio
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def __aenter__(self):
+        semaphore = self._get_semaphore()
+        await semaphore.acquire()
+        self._held.set(self._held.get() + (semaphore,))
+        self.active += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        held = self._held.get()
+        self._held.set(held[:-1])
+        self.active -= 1
+        held[-1].release()
+        return False
@@ -0,0 +1,55 @@
+"""
+Per-thread sharded counters merged on read
+"""
+import threading
+from typing import Dict, Hashable, List, Tuple
+
+class ShardedCounters:
+    """Named counters where every thread increments its own private cells
+
+    A thread only ever writes its own dict, so increments need no lock and are
+    never lost. Reads take a snapshot of every shard and sum them; shards of
+    threads that have exited are folded into a retired total.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[Tuple[threading.Thread, Dict[Hashable, int]]] = []
+        self._retired: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    def _register(self) -> Dict[Hashable, int]:
+        """Create the calling thread's shard"""
+        cells: Dict[Hashable, int] = {}
+        self._local.cells = cells
+        with self._lock:
+            self._shards.append((threading.current_thread(), cells))
+        return cells
+
+    def add(self, key: Hashable, amount: int = 1):
+        """Increment a counter from the calling thread"""
+        try:
+            cells = self._local.cells
+        except AttributeError:
+            cells = self._register()
+        cells[key] = cells.get(key, 0) + amount
+
+    def merged(self) -> Dict[Hashable, int]:
+        """Sum every shard into one dict"""
+        with self._lock:
+            live = []
+            for thread, cells in self._shards:
+                if thread.is_alive():
+                    live.append((thread, cells))
+                else:
+                    # The owner is gone, so this shard can no longer change
+                    for key, value in cells.items():
+                        self._retired[key] = self._retired.get(key, 0) + value
+            self._shards = live
+            totals = dict(self._retired)
+            shards = [cells.copy() for _thread, cells in live]
+
+        for cells in shards:
+            for key, value in cells.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
@@ -0,0 +1,166 @@
+"""
+Event sinks for lifecycle hooks
+
+Events are plain tuples (monotonic_ns, event, first, second) so recording one
+costs a clock read and a tuple. Timestamps are only turned into wall-clock
+strings when events are read or written out.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+from utils.counters import ShardedCounters
+
+Event = Tuple[int, str, Any, Any]
+
+# Offset from the monotonic clock to wall-clock epoch, sampled once
+WALL_CLOCK_OFFSET_NS = time.time_ns() - time.monotonic_ns()
+
+# Names of the two payload slots per event type
+EVENT_FIELDS = {
+    'agent_start': ('agent', None),
+    'tool_start': ('tool', None),
+    'handoff': ('from_agent', 'to_agent'),
+    'schema_violation': ('response_type', 'errors')
+}
+
+def format_timestamp(monotonic_ns: int) -> str:
+    """Convert a monotonic timestamp to an ISO wall-clock string"""
+    return datetime.fromtimestamp((monotonic_ns + WALL_CLOCK_OFFSET_NS) / 1e9).isoformat()
+
+def event_to_dict(event: Event) -> Dict[str, Any]:
+    """Expand an event tuple into the activity log dict shape"""
+    monotonic_ns, name, first, second = event
+    first_field, second_field = EVENT_FIELDS.get(name, ('value', 'detail'))
+    record = {'timestamp': format_timestamp(monotonic_ns), 'event': name}
+    if first_field:
+        record[first_field] = first
+    if second_field:
+        record[second_field] = second
+    return record
+
+class RingBufferSink:
+    """Keeps the most recent events in memory
+
+    deque.append with maxlen is atomic in CPython, so emitters never lock.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.events: deque = deque(maxlen=capacity)
+
+    def emit(self, event: Event):
+        self.events.append(event)
+
+    def recent(self, count: int = None) -> List[Event]:
+        """Get buffered events, oldest first"""
+        events = list(self.events)
+        return events if count is None else events[-count:]
+
+    def get_stats(self) -> Dict[str, int]:
+        return {'buffered': len(self.events), 'capacity': self.events.maxlen}
+
+    def close(self):
+        pass
+
+class JsonlFileSink:
+    """Writes events to a JSONL file from a background thread in batches
+
+    The queue is bounded: when the writer falls behind, new events are dropped
+    and counted rather than buffered without limit. A failed write (disk full,
+    permissions) loses and counts its batch; the writer keeps going.
+    """
+
+    def __init__(self, path: str, batch_size: int = 256, flush_interval: float = 1.0, capacity: int = 10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.counters = ShardedCounters()
+        self._queue: "queue.Queue[Event]" = queue.Queue(maxsize=capacity)
+        self._stop = threading.Event()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._writer = threading.Thread(target=self._run, name="hook-event-writer", daemon=True)
+        self._writer.start()
+
+    def emit(self, event: Event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.counters.add('dropped')
+
+    def _drain(self) -> List[Event]:
+        """Take up to one batch of queued events"""
+        batch = []
+        try:
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write(self, batch: List[Event]):
+        lines = [json.dumps(event_to_dict(event), default=str) + "\n" for event in batch]
+        try:
+            with open(self.path, "a", encoding="utf-8") as handle:
+                handle.writelines(lines)
+        except OSError as e:
+            self.counters.add('write_errors')
+            self.counters.add('dropped', len(batch))
+            if self.counters.merged().get('write_errors') == 1:
+                print(f"⚠️ Hook event log write failed, dropping events: {e}")
+            return
+        self.written += len(batch)
+
+    def _run(self):
+        """Writer loop: wait for an event, then write whatever has queued up"""
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [first] + self._drain()
+            while batch:
+                self._write(batch)
+                batch = self._drain()
+
+    def get_stats(self) -> Dict[str, int]:
+        counts = self.counters.merged()
+        return {
+            'pending_writes': self._queue.qsize(),
+            'written': self.written,
+            'dropped_events': counts.get('dropped', 0),
+            'write_errors': counts.get('write_errors', 0)
+        }
+
+    def close(self):
+        """Stop the writer and flush what is left"""
+        self._stop.set()
+        self._writer.join()
+        batch = self._drain()
+        while batch:
+            self._write(batch)
+            batch = self._drain()
+
+class ConsoleSink:
+    """Prints events as they happen (debugging only; blocks on stdout)"""
+
+    ICONS = {'agent_start': "🤖 Agent started", 'tool_start': "🔧 Tool started", 'handoff': "🔄 Handoff"}
+
+    def emit(self, event: Event):
+        _monotonic_ns, name, first, second = event
+        label = self.ICONS.get(name, name)
+        if name == 'handoff':
+            print(f"{label}: {first} → {second}")
+        else:
+            print(f"{label}: {first}")
+
+    def get_stats(self) -> Dict[str, int]:
+        return {}
+
+    def close(self):
+        pass
@@ -0,0 +1,47 @@
+"""
+Deeply frozen containers for shared, read-only payloads
+"""
+from typing import Any
+
+class FrozenDict(dict):
+    """Read-only dict that still passes isinstance(value, dict) checks"""
+    
+    __slots__ = ()
+    
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("FrozenDict is read-only")
+    
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+    
+    def __hash__(self):
+        return hash(frozenset(self.items()))
+    
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+    
+    def __copy__(self):
+        return self
+    
+    def __deepcopy__(self, memo):
+        return self
+
+def deep_freeze(value: Any) -> Any:
+    """Recursively convert dicts to FrozenDict and lists to tuples"""
+    if isinstance(value, FrozenDict):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((key, deep_freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(deep_freeze(item) for item in value)
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+def thaw(value: Any) -> Any:
+    """Recursively convert frozen containers back to plain dicts and lists"""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
@@ -0,0 +1,140 @@
+"""
+Fixed-memory log-bucketed latency histograms
+"""
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+# 32 linear sub-buckets per power of two: about 3% relative error
+SUB_BUCKET_BITS = 5
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+# Values are microseconds; anything above ~2^40 us (12 days) is clamped
+MAX_SHIFT = 35
+BUCKET_COUNT = SUB_BUCKET_COUNT * (MAX_SHIFT + 2)
+MAX_VALUE = ((SUB_BUCKET_COUNT * 2) << MAX_SHIFT) - 1
+
+def bucket_index(value: int) -> int:
+    """Bucket holding a non-negative integer value"""
+    if value < SUB_BUCKET_COUNT * 2:
+        return max(value, 0)
+    value = min(value, MAX_VALUE)
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return shift * SUB_BUCKET_COUNT + (value >> shift)
+
+def bucket_upper_bound(index: int) -> int:
+    """Highest value that falls into a bucket"""
+    if index < SUB_BUCKET_COUNT * 2:
+        return index
+    shift, mantissa = divmod(index - SUB_BUCKET_COUNT, SUB_BUCKET_COUNT)
+    return ((SUB_BUCKET_COUNT + mantissa + 1) << shift) - 1
+
+class LatencyHistogram:
+    """HDR-style histogram of microsecond latencies in a fixed array of buckets
+
+    Recording is one index computation and one increment. Percentiles are read
+    from the buckets and are accurate to about 3%; max is exact. Counts are
+    never cleared: a reset only moves the baseline summaries are taken from,
+    so exported cumulative counts never go backwards.
+    """
+
+    PERCENTILES = (50, 90, 99)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: List[int] = [0] * BUCKET_COUNT
+        self._total = 0
+        self._sum = 0
+        self._max = 0
+        # Counts, total and sum at the start of the current interval
+        self._baseline: Tuple[List[int], int, int] = ([0] * BUCKET_COUNT, 0, 0)
+
+    def record(self, micros: int):
+        """Record one latency in microseconds"""
+        index = bucket_index(micros)
+        with self._lock:
+            self._counts[index] += 1
+            self._total += 1
+            self._sum += micros
+            if micros > self._max:
+                self._max = micros
+
+    def _interval(self, reset: bool) -> Tuple[List[int], int, int, int]:
+        """Counts, total, sum and max since the last reset, optionally starting a fresh interval"""
+        with self._lock:
+            counts, total, total_sum, maximum = list(self._counts), self._total, self._sum, self._max
+            base_counts, base_total, base_sum = self._baseline
+            if reset:
+                self._baseline = (counts, total, total_sum)
+                self._max = 0
+        interval = [count - base for count, base in zip(counts, base_counts)]
+        return interval, total - base_total, total_sum - base_sum, maximum
+
+    def cumulative_counts(self, bounds: Sequence[int]) -> Tuple[List[int], int, int]:
+        """Lifetime counts at or below each ascending bound (microseconds), plus total and sum"""
+        with self._lock:
+            counts, total, total_sum = list(self._counts), self._total, self._sum
+        cumulative = []
+        seen = 0
+        index = 0
+        for bound in bounds:
+            while index < BUCKET_COUNT and bucket_upper_bound(index) <= bound:
+                seen += counts[index]
+                index += 1
+            cumulative.append(seen)
+        return cumulative, total, total_sum
+
+    def snapshot(self, reset: bool = False) -> Dict[str, float]:
+        """Count, mean, p50/p90/p99 and max in milliseconds"""
+        counts, total, total_sum, maximum = self._interval(reset)
+        summary = {'count': total}
+        if not total:
+            return summary
+
+        targets = [(percentile, -(-total * percentile // 100)) for percentile in self.PERCENTILES]
+        seen = 0
+        for index, count in enumerate(counts):
+            if not count:
+                continue
+            seen += count
+            while targets and seen >= targets[0][1]:
+                percentile, _rank = targets.pop(0)
+                summary[f'p{percentile}_ms'] = min(bucket_upper_bound(index), maximum) / 1000
+            if not targets:
+                break
+
+        summary['mean_ms'] = round(total_sum / total / 1000, 3)
+        summary['max_ms'] = maximum / 1000
+        return summary
+
+class LatencyRecorder:
+    """Latency histograms grouped by dimension (tool, intent, ...) and key"""
+
+    def __init__(self):
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, dimension: str, key: str) -> LatencyHistogram:
+        """Get the histogram for one key, creating it on first use"""
+        histogram = self._histograms.get((dimension, key))
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault((dimension, key), LatencyHistogram())
+        return histogram
+
+    def record(self, micros: int, **keys: str):
+        """Record one latency under every given dimension, e.g. tool=..., intent=..."""
+        for dimension, key in keys.items():
+            if key is not None:
+                self.histogram(dimension, str(key)).record(micros)
+
+    def items(self) -> List[Tuple[str, str, LatencyHistogram]]:
+        """Every (dimension, key, histogram), sorted"""
+        with self._lock:
+            histograms = list(self._histograms.items())
+        return [(dimension, key, histogram) for (dimension, key), histogram in sorted(histograms, key=lambda item: item[0])]
+
+    def snapshot(self, reset: bool = False) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Summaries as {dimension: {key: summary}}"""
+        report: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for dimension, key, histogram in self.items():
+            report.setdefault(dimension, {})[key] = histogram.snapshot(reset)
+        return report
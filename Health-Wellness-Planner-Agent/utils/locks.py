@@ -0,0 +1,38 @@
+"""
+Striped locks for per-user state
+"""
+import os
+import threading
+from contextlib import ExitStack, contextmanager
+from typing import Hashable, Iterable, Iterator
+
+class StripedLock:
+    """Fixed pool of reentrant locks; a key always maps to the same stripe
+
+    Unrelated keys rarely share a stripe, so users only contend with the few
+    others hashed next to them instead of queueing behind one global lock.
+    """
+    
+    def __init__(self, stripes: int = 64):
+        if stripes < 1:
+            raise ValueError("stripes must be at least 1")
+        self._locks = [threading.RLock() for _ in range(stripes)]
+    
+    def __len__(self) -> int:
+        return len(self._locks)
+    
+    def for_key(self, key: Hashable) -> threading.RLock:
+        """Get the lock guarding a key"""
+        return self._locks[hash(key) % len(self._locks)]
+    
+    @contextmanager
+    def holding(self, keys: Iterable[Hashable]) -> Iterator[None]:
+        """Hold the stripes of several keys at once, taken in stripe order so batch holders can't deadlock"""
+        stripes = sorted({hash(key) % len(self._locks) for key in keys})
+        with ExitStack() as stack:
+            for stripe in stripes:
+                stack.enter_context(self._locks[stripe])
+            yield
+
+# Global stripes guarding per-user session state
+session_locks = StripedLock(int(os.getenv("SESSION_LOCK_STRIPES", "64")))
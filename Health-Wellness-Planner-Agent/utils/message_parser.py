@@ -0,0 +1,229 @@
+"""
+Single-pass message parser for intent and handoff routing
+"""
+import re
+from typing import Dict, Any, List, Optional, NamedTuple, Tuple
+
+# Keyword tables - order matters, the first category with a hit wins
+INTENT_KEYWORDS = [
+    ('goal', ['goal', 'want to', 'trying to']),
+    ('meal', ['meal', 'food', 'diet', 'eat']),
+    ('workout', ['workout', 'exercise', 'fitness']),
+    ('progress', ['progress', 'update', 'track']),
+    ('schedule', ['schedule', 'remind', 'checkin'])
+]
+
+HANDOFF_KEYWORDS = [
+    ('escalation_agent', ['human', 'coach', 'trainer', 'person']),
+    ('nutrition_expert_agent', ['diabetes', 'allergy', 'allergies', 'allergic']),
+    ('injury_support_agent', ['injury', 'pain', 'hurt'])
+]
+
+DIET_KEYWORDS = [
+    ('vegetarian', ['vegetarian']),
+    ('vegan', ['vegan']),
+    ('keto', ['keto'])
+]
+
+NUTRITION_KEYWORDS = [
+    ('diabetes', ['diabetes']),
+    ('allergies', ['allergy', 'allergies', 'allergic'])
+]
+
+# An allergen counts only next to an avoidance cue (see ALLERGY_CUE_KEYWORDS). Overlapping
+# words ("peanuts", "shellfish") also flag the shorter allergen, erring on the safe side
+ALLERGEN_KEYWORDS = [
+    ('nuts', ['nuts', 'nut-free', 'nut free', 'nut allerg', 'tree nut', 'almond', 'cashew', 'walnut', 'pecan',
+              'hazelnut', 'pistachio']),
+    ('peanuts', ['peanut']),
+    ('dairy', ['dairy', 'lactose']),
+    ('eggs', ['eggs', 'egg-free', 'egg free', 'egg allerg']),
+    ('gluten', ['gluten', 'wheat', 'celiac', 'coeliac']),
+    ('soy', ['soy']),
+    ('fish', ['fish']),
+    ('shellfish', ['shellfish', 'shrimp', 'prawn', 'crab', 'lobster']),
+    ('sesame', ['sesame'])
+]
+
+# Cues that come before the allergens they exclude ("without dairy or eggs") and after them ("nut-free")
+ALLERGY_CUE_KEYWORDS = [
+    ('before', ['allergic to', 'allergy to', 'allergies to', 'intolerant to', 'avoid', 'without', 'no ',
+                "can't eat", 'cannot eat', "can't have", 'free from', 'free of']),
+    ('after', ['-free', ' free', ' allerg', ' intoleran'])
+]
+
+# What may sit between a cue and its allergens, or between allergens in a list
+ALLERGEN_LIST_FILLER = re.compile(r"(?:[\s,/&]|\x00|\b(?:and|or|nor|any|all|also|to|of|foods?|products?)\b)*")
+
+INJURY_KEYWORDS = [
+    ('knee', ['knee']),
+    ('back', ['back']),
+    ('shoulder', ['shoulder'])
+]
+
+FREQUENCY_KEYWORDS = [
+    ('daily', ['daily']),
+    ('weekly', ['weekly'])
+]
+
+HELP_KEYWORDS = [
+    ('help', ['help', 'what can you do'])
+]
+
+# Table name -> (keyword table, default value)
+KEYWORD_TABLES = {
+    'intent': (INTENT_KEYWORDS, 'general'),
+    'handoff': (HANDOFF_KEYWORDS, None),
+    'diet_type': (DIET_KEYWORDS, 'omnivore'),
+    'nutrition_type': (NUTRITION_KEYWORDS, 'general'),
+    'injury_type': (INJURY_KEYWORDS, 'general'),
+    'frequency': (FREQUENCY_KEYWORDS, 'weekly'),
+    'help': (HELP_KEYWORDS, None),
+    'allergens': (ALLERGEN_KEYWORDS, ()),
+    'allergy_cue': (ALLERGY_CUE_KEYWORDS, None)
+}
+
+# Tables resolved from where their keywords sit in the message, not just whether they occur
+SPAN_TABLES = {'allergens', 'allergy_cue'}
+
+
+class ParsedMessage(NamedTuple):
+    """Result of a single scan over a user message"""
+    text: str
+    intent: str
+    handoff: Optional[str]
+    diet_type: str
+    allergens: Tuple[str, ...]
+    nutrition_type: str
+    injury_type: str
+    frequency: str
+    is_help: bool
+    weight: Optional[str]
+    workouts_completed: Optional[str]
+
+    @property
+    def progress_data(self) -> Dict[str, Any]:
+        """Progress payload in the shape expected by ProgressTrackerTool"""
+        data = {'notes': self.text}
+        if self.weight is not None:
+            data['weight'] = self.weight
+        if self.workouts_completed is not None:
+            data['workouts_completed'] = self.workouts_completed
+        return data
+
+
+class MessageParser:
+    """Compiled matcher built once from all keyword tables"""
+
+    def __init__(self, tables: Dict[str, Any] = None, span_tables: set = None):
+        self.tables = tables or KEYWORD_TABLES
+        self.span_tables = SPAN_TABLES if span_tables is None else span_tables
+
+        # keyword -> list of (table, rank, value) it votes for
+        self.keyword_hits: Dict[str, List[tuple]] = {}
+        for table, (entries, _default) in self.tables.items():
+            for rank, (value, words) in enumerate(entries):
+                for word in words:
+                    self.keyword_hits.setdefault(word, []).append((table, rank, value))
+
+        # A match on a keyword also implies every keyword that is a prefix of it,
+        # since only the longest alternative is reported at a given position
+        keywords = sorted(self.keyword_hits, key=len, reverse=True)
+        self.implied_hits = {
+            word: [hit for other in keywords if word.startswith(other) for hit in self.keyword_hits[other]]
+            for word in keywords
+        }
+
+        # One alternation, scanned as a lookahead so overlapping keywords are all seen
+        alternation = '|'.join(re.escape(word) for word in keywords)
+        self.pattern = re.compile(
+            r'(?=(?P<kw>' + alternation + r')'
+            r'|(?P<weight>\d+(?:\.\d+)?)\s*(?:kg|lbs)'
+            r'|(?P<workouts>\d+)\s*workout)'
+        )
+
+    def parse(self, message: str) -> ParsedMessage:
+        """Scan the message once and resolve every keyword table"""
+        best: Dict[str, tuple] = {}
+        spans: Dict[str, List[tuple]] = {}
+        weight = None
+        workouts = None
+        text = message.lower()
+
+        for match in self.pattern.finditer(text):
+            keyword = match.group('kw')
+            if keyword is not None:
+                for table, rank, value in self.implied_hits[keyword]:
+                    if table in self.span_tables:
+                        spans.setdefault(table, []).append((match.start(), match.start() + len(keyword), rank, value))
+                        continue
+                    current = best.get(table)
+                    if current is None or rank < current[0]:
+                        best[table] = (rank, value)
+            elif match.group('weight') is not None:
+                if weight is None:
+                    weight = match.group('weight')
+            elif workouts is None:
+                workouts = match.group('workouts')
+
+        resolved = {}
+        for table, (_entries, default) in self.tables.items():
+            if table in self.span_tables:
+                continue
+            hit = best.get(table)
+            resolved[table] = hit[1] if hit else default
+
+        return ParsedMessage(
+            text=message,
+            intent=resolved['intent'],
+            handoff=resolved['handoff'],
+            diet_type=resolved['diet_type'],
+            allergens=self.cued_allergens(text, spans.get('allergens', ()), spans.get('allergy_cue', ())),
+            nutrition_type=resolved['nutrition_type'],
+            injury_type=resolved['injury_type'],
+            frequency=resolved['frequency'],
+            is_help=resolved['help'] is not None,
+            weight=weight,
+            workouts_completed=workouts
+        )
+
+    @staticmethod
+    def cued_allergens(text: str, allergens: List[tuple], cues: List[tuple]) -> Tuple[str, ...]:
+        """Allergens next to an avoidance cue: "without dairy", "nut-free", "allergic to fish, eggs or soy"
+
+        Each allergen stands for the whole word it is in ("almonds", "peanuts"),
+        and a cue reaches every allergen in a list joined by commas, "and" or "or".
+        """
+        if not allergens or not cues:
+            return ()
+
+        words = []
+        for start, end, rank, value in allergens:
+            while start > 0 and text[start - 1].isalnum():
+                start -= 1
+            while end < len(text) and text[end].isalnum():
+                end += 1
+            words.append((start, end, rank, value))
+
+        # Allergen words are masked so a list of them reads as filler between a cue and each allergen
+        masked = list(text)
+        for start, end, _rank, _value in words:
+            masked[start:end] = "\x00" * (end - start)
+        masked = "".join(masked)
+
+        found = {}
+        for start, end, rank, value in words:
+            for cue_start, cue_end, _cue_rank, side in cues:
+                if side == 'before':
+                    # A cue starts a word, so "piano eggs" doesn't read as "no eggs"
+                    cued = (cue_end <= start and not (cue_start and text[cue_start - 1].isalnum())
+                            and ALLERGEN_LIST_FILLER.fullmatch(masked, cue_end, start))
+                else:
+                    cued = start <= cue_start and (cue_start <= end or ALLERGEN_LIST_FILLER.fullmatch(masked, end, cue_start))
+                if cued:
+                    found[rank] = value
+                    break
+        return tuple(found[rank] for rank in sorted(found))
+
+# Global message parser
+message_parser = MessageParser()
@@ -0,0 +1,199 @@
+"""
+Typed columnar store for per-user progress metrics
+"""
+import math
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Sentinel for "not reported" in the integer workouts column
+MISSING_COUNT = -1
+
+class ProgressMetricStore:
+    """Append-only columns of progress metrics backed by NumPy arrays
+
+    Columns: timestamp (float64 epoch seconds), weight (float64, NaN when not
+    reported), workouts_completed (int64, -1 when not reported) and log_type
+    (uint8 codes into `categories`). Storage grows by doubling, so appends are
+    amortised O(1); views from to_numpy() still see the old arrays after a
+    reallocation and go stale, so take them again after appending. Time
+    ranges are binary-searched while timestamps arrive in order; once a
+    back-dated row is appended they fall back to a boolean mask. NumPy is
+    imported on first use to keep session construction cheap.
+    """
+
+    INITIAL_CAPACITY = 16
+
+    def __init__(self):
+        self.categories: List[str] = []
+        self._category_codes: Dict[str, int] = {}
+        self._columns: Dict[str, Any] = None
+        self._size = 0
+        # Whether timestamps are non-decreasing, so time ranges can be binary-searched
+        self._sorted = True
+        self._lock = threading.Lock()
+
+    def _allocate(self, capacity: int):
+        """Allocate (or grow) the column arrays (caller holds the lock)"""
+        import numpy as np
+
+        columns = {
+            "timestamp": np.empty(capacity, dtype=np.float64),
+            "weight": np.empty(capacity, dtype=np.float64),
+            "workouts_completed": np.empty(capacity, dtype=np.int64),
+            "log_type": np.empty(capacity, dtype=np.uint8)
+        }
+        if self._columns is not None:
+            for name, column in columns.items():
+                column[:self._size] = self._columns[name][:self._size]
+        self._columns = columns
+
+    def _code_for(self, log_type: str) -> int:
+        """Get the categorical code for a log type (caller holds the lock)"""
+        code = self._category_codes.get(log_type)
+        if code is None:
+            if len(self.categories) == 256:
+                raise ValueError("Too many distinct log types")
+            code = self._category_codes[log_type] = len(self.categories)
+            self.categories.append(log_type)
+        return code
+
+    def append(self, log_type: str, weight: Optional[float] = None, workouts_completed: Optional[int] = None,
+               timestamp: Optional[float] = None):
+        """Append one row"""
+        with self._lock:
+            if self._columns is None:
+                self._allocate(self.INITIAL_CAPACITY)
+            elif self._size == len(self._columns["timestamp"]):
+                self._allocate(max(self._size * 2, self.INITIAL_CAPACITY))
+
+            row = self._size
+            timestamp = time.time() if timestamp is None else timestamp
+            if row and timestamp < self._columns["timestamp"][row - 1]:
+                self._sorted = False
+            self._columns["timestamp"][row] = timestamp
+            self._columns["weight"][row] = math.nan if weight is None else weight
+            self._columns["workouts_completed"][row] = MISSING_COUNT if workouts_completed is None else workouts_completed
+            self._columns["log_type"][row] = self._code_for(log_type)
+            self._size = row + 1
+
+    def __len__(self) -> int:
+        return self._size
+
+    def row_range(self, start_time: float = None, end_time: float = None) -> Tuple[int, int]:
+        """Row indices [start, stop) whose timestamps fall in [start_time, end_time)
+
+        Bounds need timestamps in order; raises ValueError otherwise.
+        """
+        if not self._size:
+            return 0, 0
+        if not self._sorted and (start_time is not None or end_time is not None):
+            raise ValueError("Timestamps are out of order; select rows with to_numpy()")
+        timestamps = self._columns["timestamp"][:self._size]
+        start = 0 if start_time is None else int(timestamps.searchsorted(start_time, side="left"))
+        stop = self._size if end_time is None else int(timestamps.searchsorted(end_time, side="left"))
+        return start, max(start, stop)
+
+    def to_numpy(self, start_time: float = None, end_time: float = None) -> Dict[str, Any]:
+        """Zero-copy views of every column, optionally limited to a time range
+
+        Once timestamps are out of order a time range is selected with a
+        boolean mask instead, which returns copies.
+        """
+        with self._lock:
+            if self._columns is None:
+                self._allocate(self.INITIAL_CAPACITY)
+            if not self._sorted and (start_time is not None or end_time is not None):
+                import numpy as np
+
+                timestamps = self._columns["timestamp"][:self._size]
+                keep = np.ones(self._size, dtype=bool)
+                if start_time is not None:
+                    keep &= timestamps >= start_time
+                if end_time is not None:
+                    keep &= timestamps < end_time
+                return {name: column[:self._size][keep] for name, column in self._columns.items()}
+            start, stop = self.row_range(start_time, end_time)
+            return {name: column[start:stop] for name, column in self._columns.items()}
+
+    def slice(self, start_time: float = None, end_time: float = None) -> "ProgressMetricStore":
+        """Copy of the rows in a time range as a new store"""
+        columns = self.to_numpy(start_time, end_time)
+        sliced = ProgressMetricStore()
+        sliced.categories = list(self.categories)
+        sliced._category_codes = dict(self._category_codes)
+        sliced._columns = {name: column.copy() for name, column in columns.items()}
+        sliced._size = len(columns["timestamp"])
+        sliced._sorted = bool((columns["timestamp"][1:] >= columns["timestamp"][:-1]).all())
+        return sliced
+
+    def weight_change(self) -> Optional[float]:
+        """Difference between the latest and the earliest reported weight"""
+        import numpy as np
+
+        weights = self.to_numpy()["weight"]
+        reported = weights[~np.isnan(weights)]
+        if len(reported) < 2:
+            return None
+        return float(reported[-1] - reported[0])
+
+    def latest_weight(self) -> Optional[float]:
+        """Most recently reported weight"""
+        import numpy as np
+
+        weights = self.to_numpy()["weight"]
+        reported = np.flatnonzero(~np.isnan(weights))
+        if not len(reported):
+            return None
+        return float(weights[reported[-1]])
+
+    def to_state(self) -> Dict[str, Any]:
+        """Serializable column lists; missing weights become None"""
+        if not self._size:
+            return {"categories": list(self.categories), "timestamp": [], "weight": [],
+                    "workouts_completed": [], "log_type": []}
+        columns = self.to_numpy()
+        return {
+            "categories": list(self.categories),
+            "timestamp": columns["timestamp"].tolist(),
+            "weight": [None if math.isnan(value) else value for value in columns["weight"].tolist()],
+            "workouts_completed": columns["workouts_completed"].tolist(),
+            "log_type": columns["log_type"].tolist()
+        }
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return self.to_state()
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__init__()
+        self._load(state)
+
+    def _load(self, state: Dict[str, Any]):
+        """Append the rows of a to_state() dict"""
+        categories = state.get("categories", [])
+        for timestamp, weight, workouts, code in zip(state.get("timestamp", []), state.get("weight", []),
+                                                     state.get("workouts_completed", []), state.get("log_type", [])):
+            self.append(categories[code], weight=weight,
+                        workouts_completed=None if workouts == MISSING_COUNT else workouts,
+                        timestamp=timestamp)
+
+    def __repr__(self) -> str:
+        return f"ProgressMetricStore(rows={self._size})"
+
+    @classmethod
+    def from_value(cls, value: Any) -> "ProgressMetricStore":
+        """Build a store from a ProgressMetricStore or a to_state() dict"""
+        if isinstance(value, cls):
+            return value
+        store = cls()
+        if value:
+            store._load(value)
+        return store
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source_type, handler):
+        from pydantic_core import core_schema
+        return core_schema.no_info_plain_validator_function(
+            cls.from_value,
+            serialization=core_schema.plain_serializer_function_ser_schema(lambda store: store.to_state())
+        )
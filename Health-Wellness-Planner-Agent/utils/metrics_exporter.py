@@ -0,0 +1,214 @@
+"""
+OpenMetrics / Prometheus text exposition of hook_manager metrics
+"""
+import os
+import re
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+from hooks import hook_manager, HookManager
+
+PREFIX = "health_agent"
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Histogram bucket bounds in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Metric source fields that only ever grow
+COUNTER_FIELDS = {'hits', 'misses', 'evictions', 'reads', 'cache_hits', 'writes', 'flushes', 'flush_errors',
+                  'written', 'dropped_events', 'write_errors', 'checked', 'violations', 'calls'}
+
+# Label name for metric source fields that hold one stats dict per item
+LABEL_NAMES = {'namespaces': 'namespace', 'intents': 'intent'}
+
+def metric_name(*parts: str) -> str:
+    """Join parts into a valid metric name"""
+    return re.sub(r"[^a-zA-Z0-9_]", "_", "_".join(part for part in parts if part))
+
+def format_labels(labels: Dict[str, Any]) -> str:
+    """Render a label set, escaping values"""
+    if not labels:
+        return ""
+    rendered = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        rendered.append(f'{name}="{value}"')
+    return "{" + ",".join(rendered) + "}"
+
+def format_value(value: float) -> str:
+    """Render a sample value"""
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+class MetricFamily:
+    """One metric family: type, help and its samples"""
+
+    def __init__(self, name: str, kind: str, help_text: str):
+        self.name = name
+        self.kind = kind
+        self.help_text = help_text
+        self.samples: List[Tuple[str, Dict[str, Any], float]] = []
+
+    def add(self, value: float, suffix: str = "", **labels: Any):
+        self.samples.append((self.name + suffix, labels, value))
+
+    def render(self, openmetrics: bool) -> List[str]:
+        # The Prometheus text format names counters by their _total sample
+        name = self.name + "_total" if self.kind == "counter" and not openmetrics else self.name
+        lines = [f"# TYPE {name} {self.kind}", f"# HELP {name} {self.help_text}"]
+        for sample_name, labels, value in self.samples:
+            lines.append(f"{sample_name}{format_labels(labels)} {format_value(value)}")
+        return lines
+
+def counter_families(manager: HookManager) -> List[MetricFamily]:
+    """Interaction, tool and handoff counters"""
+    counts = manager.metrics
+    interactions = MetricFamily(metric_name(PREFIX, "interactions"), "counter", "Agent interactions started")
+    interactions.add(counts['total_interactions'], "_total")
+
+    tools = MetricFamily(metric_name(PREFIX, "tool_calls"), "counter", "Tool invocations by tool")
+    for tool, count in sorted(counts['tool_usage'].items()):
+        tools.add(count, "_total", tool=tool)
+
+    handoffs = MetricFamily(metric_name(PREFIX, "handoffs"), "counter", "Handoffs to specialist agents")
+    for handoff, count in sorted(counts['handoffs'].items()):
+        handoffs.add(count, "_total", handoff=handoff)
+    return [interactions, tools, handoffs]
+
+def latency_families(manager: HookManager) -> List[MetricFamily]:
+    """One histogram family per latency dimension (tool, handoff, intent, response_type)"""
+    families: Dict[str, MetricFamily] = {}
+    bounds = [round(bound * 1e6) for bound in LATENCY_BUCKETS]
+    for dimension, key, histogram in manager.latency.items():
+        family = families.get(dimension)
+        if family is None:
+            family = families[dimension] = MetricFamily(
+                metric_name(PREFIX, dimension, "latency_seconds"), "histogram", f"Handler latency by {dimension}"
+            )
+        cumulative, total, total_sum = histogram.cumulative_counts(bounds)
+        for bound, count in zip(LATENCY_BUCKETS, cumulative):
+            family.add(count, "_bucket", **{dimension: key, 'le': repr(bound)})
+        family.add(total, "_bucket", **{dimension: key, 'le': "+Inf"})
+        family.add(total, "_count", **{dimension: key})
+        family.add(total_sum / 1e6, "_sum", **{dimension: key})
+    return list(families.values())
+
+def source_families(manager: HookManager) -> List[MetricFamily]:
+    """Numeric fields of every registered metrics source (sessions, cache, events, ...)"""
+    families: Dict[str, MetricFamily] = {}
+
+    def add(source: str, field: str, value: Any, labels: Dict[str, Any]):
+        name = metric_name(PREFIX, source, field)
+        kind = "counter" if field in COUNTER_FIELDS else "gauge"
+        family = families.get(name)
+        if family is None:
+            family = families[name] = MetricFamily(name, kind, f"{source} {field.replace('_', ' ')}")
+        family.add(value, "_total" if kind == "counter" else "", **labels)
+
+    def walk(source: str, stats: Dict[str, Any], labels: Dict[str, Any]):
+        for field, value in stats.items():
+            if isinstance(value, (int, float)):
+                add(source, field, value, labels)
+            elif isinstance(value, dict) and value and all(isinstance(item, dict) for item in value.values()):
+                label = LABEL_NAMES.get(field, field)
+                for item, item_stats in sorted(value.items()):
+                    walk(source, item_stats, {**labels, label: item})
+
+    for source, read in list(manager.metric_sources.items()):
+        if source == 'latency':
+            continue
+        walk(source, read(), {})
+
+    # Hit rates per cache namespace
+    hits = families.get(metric_name(PREFIX, "cache", "hits"))
+    misses = families.get(metric_name(PREFIX, "cache", "misses"))
+    if hits and misses:
+        ratio = MetricFamily(metric_name(PREFIX, "cache", "hit_ratio"), "gauge", "Result cache hit ratio")
+        for (_name, labels, hit), (_other, _labels, miss) in zip(hits.samples, misses.samples):
+            ratio.add(hit / (hit + miss) if hit + miss else 0.0, **labels)
+        families[ratio.name] = ratio
+    return list(families.values())
+
+def render(manager: HookManager = None, openmetrics: bool = True) -> str:
+    """Render every metric in OpenMetrics (default) or Prometheus text format"""
+    manager = manager or hook_manager
+    lines: List[str] = []
+    for family in counter_families(manager) + latency_families(manager) + source_families(manager):
+        lines.extend(family.render(openmetrics))
+    if openmetrics:
+        lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+def write_textfile(path: str, manager: HookManager = None):
+    """Atomically write metrics for the node-exporter textfile collector"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(dir=directory, prefix=".metrics_", suffix=".prom")
+    with os.fdopen(handle, "w", encoding="utf-8") as output:
+        output.write(render(manager, openmetrics=False))
+    os.replace(temp_path, path)
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves /metrics"""
+
+    manager: HookManager = None
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+        body = render(self.manager, openmetrics=openmetrics).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_http_server(port: int, host: str = "127.0.0.1", manager: HookManager = None) -> ThreadingHTTPServer:
+    """Serve /metrics from a daemon thread; returns the server (call shutdown() to stop)"""
+    handler = type("BoundMetricsHandler", (MetricsHandler,), {"manager": manager or hook_manager})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+def start_textfile_writer(path: str, interval: float = 15.0, manager: HookManager = None) -> threading.Event:
+    """Rewrite the textfile every interval seconds from a daemon thread; set the returned event to stop"""
+    stop = threading.Event()
+
+    def loop():
+        while True:
+            try:
+                write_textfile(path, manager)
+            except OSError as e:
+                print(f"⚠️ Metrics textfile write failed: {e}")
+            if stop.wait(interval):
+                break
+
+    threading.Thread(target=loop, name="metrics-textfile", daemon=True).start()
+    return stop
+
+# Exporters started from the environment, once per process
+_started = False
+_started_lock = threading.Lock()
+
+def start_from_env():
+    """Start the exporters configured by METRICS_PORT / METRICS_TEXTFILE"""
+    global _started
+    with _started_lock:
+        if _started:
+            return
+        _started = True
+        if os.getenv("METRICS_PORT"):
+            start_http_server(int(os.getenv("METRICS_PORT")), os.getenv("METRICS_HOST", "127.0.0.1"))
+        if os.getenv("METRICS_TEXTFILE"):
+            start_textfile_writer(os.getenv("METRICS_TEXTFILE"), float(os.getenv("METRICS_TEXTFILE_INTERVAL", "15")))
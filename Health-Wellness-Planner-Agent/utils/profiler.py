@@ -0,0 +1,183 @@
+"""
+On-demand sampling profiler producing collapsed stacks for flamegraphs
+"""
+import atexit
+import itertools
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List
+
+def frame_label(frame: Any) -> str:
+    """module:qualname label for a Python frame"""
+    code = frame.f_code
+    module = frame.f_globals.get("__name__") or os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+def builtin_label(function: Any) -> str:
+    """Label for a C function"""
+    module = getattr(function, "__module__", None) or "builtins"
+    return f"{module}:{getattr(function, '__qualname__', repr(function))}"
+
+class StackRecorder:
+    """sys.setprofile callback attributing self time to full call stacks
+
+    Keys are collapsed stacks ("root;outer;inner;leaf"), built incrementally as
+    frames are pushed. Time spent inside the callback itself is excluded.
+    """
+
+    def __init__(self, root: str):
+        self.keys: List[str] = [root]
+        self.self_time: Dict[str, int] = {}
+        self._last = time.perf_counter_ns()
+
+    def __call__(self, frame, event, arg):
+        now = time.perf_counter_ns()
+        key = self.keys[-1]
+        self.self_time[key] = self.self_time.get(key, 0) + now - self._last
+
+        if event == "call":
+            self._push(frame_label(frame))
+        elif event == "c_call":
+            self._push(builtin_label(arg))
+        elif len(self.keys) > 1:
+            # return, c_return, c_exception; the root frame is never popped
+            self.keys.pop()
+        self._last = time.perf_counter_ns()
+
+    def _push(self, label: str):
+        self.keys.append(f"{self.keys[-1]};{label}")
+
+class _Sample:
+    """One profiled call; tag() sets the intent it is filed under"""
+
+    def __init__(self, profiler: "SamplingProfiler", root: str):
+        self.profiler = profiler
+        self.intent = "unknown"
+        self.recorder = StackRecorder(root)
+        self._previous = None
+        self._started = 0
+
+    def tag(self, intent: str):
+        self.intent = intent or "unknown"
+
+    def __enter__(self) -> "_Sample":
+        self._previous = sys.getprofile()
+        self._started = time.perf_counter_ns()
+        sys.setprofile(self.recorder)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        sys.setprofile(self._previous)
+        self.profiler._record(self.intent, self.recorder.self_time, time.perf_counter_ns() - self._started)
+        return False
+
+class _NoSample:
+    """Stand-in for calls that are not profiled"""
+
+    def tag(self, intent: str):
+        pass
+
+    def __enter__(self) -> "_NoSample":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NO_SAMPLE = _NoSample()
+
+class SamplingProfiler:
+    """Profiles 1 in N calls, optionally only for a time window
+
+    Each profiled call runs under a stack-recording sys.setprofile hook on its
+    own thread; stacks are merged per intent and written as collapsed-stack
+    files (one line per stack: "frame;frame;frame <microseconds>") that
+    flamegraph.pl, speedscope or inferno render directly.
+    """
+
+    def __init__(self):
+        self.active = False
+        self.every = 1
+        self.deadline = None
+        self._sequence = itertools.count()
+        self._stacks: Dict[str, Dict[str, int]] = {}
+        self._calls: Dict[str, int] = {}
+        self._wall_ns: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def enable(self, every: int = 1, duration: float = None):
+        """Profile one call in every `every`; stop by itself after `duration` seconds"""
+        self.every = max(1, int(every))
+        self.deadline = time.monotonic() + duration if duration else None
+        self._sequence = itertools.count()
+        self.active = True
+
+    def disable(self):
+        self.active = False
+
+    def sample(self, root: str):
+        """Context manager profiling this call, labelled `root`, if it is selected"""
+        if not self.active:
+            return NO_SAMPLE
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.active = False
+            return NO_SAMPLE
+        if next(self._sequence) % self.every:
+            return NO_SAMPLE
+        return _Sample(self, root)
+
+    def _record(self, intent: str, self_time: Dict[str, int], wall_ns: int):
+        """Merge one call's stacks into the intent's totals"""
+        with self._lock:
+            stacks = self._stacks.setdefault(intent, {})
+            for key, elapsed in self_time.items():
+                stacks[key] = stacks.get(key, 0) + elapsed
+            self._calls[intent] = self._calls.get(intent, 0) + 1
+            self._wall_ns[intent] = self._wall_ns.get(intent, 0) + wall_ns
+
+    def collapsed(self, intent: str = None) -> List[str]:
+        """Collapsed-stack lines for one intent, or all intents rooted at "intent:<name>" """
+        with self._lock:
+            if intent is not None:
+                stacks = dict(self._stacks.get(intent, {}))
+            else:
+                stacks = {
+                    f"intent:{name};{key}": elapsed
+                    for name, intent_stacks in self._stacks.items()
+                    for key, elapsed in intent_stacks.items()
+                }
+        return [f"{key} {elapsed // 1000}" for key, elapsed in sorted(stacks.items()) if elapsed >= 1000]
+
+    def write(self, directory: str) -> List[str]:
+        """Write all.collapsed plus one <intent>.collapsed per intent; returns the paths"""
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for intent in [None] + sorted(self._stacks):
+            path = os.path.join(directory, f"{intent or 'all'}.collapsed")
+            with open(path, "w", encoding="utf-8") as output:
+                output.write("\n".join(self.collapsed(intent)) + "\n")
+            paths.append(path)
+        return paths
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self._calls.clear()
+            self._wall_ns.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Profiled calls and mean wall time per intent"""
+        with self._lock:
+            intents = {
+                intent: {'calls': calls, 'mean_ms': round(self._wall_ns[intent] / calls / 1e6, 3)}
+                for intent, calls in self._calls.items()
+            }
+        return {'active': self.active, 'every': self.every, 'intents': intents}
+
+# Global profiler, optionally enabled from the environment
+profiler = SamplingProfiler()
+if os.getenv("PROFILE_EVERY"):
+    profiler.enable(int(os.getenv("PROFILE_EVERY")), float(os.getenv("PROFILE_DURATION", "0")) or None)
+if os.getenv("PROFILE_DIR"):
+    atexit.register(lambda: profiler.write(os.getenv("PROFILE_DIR")))
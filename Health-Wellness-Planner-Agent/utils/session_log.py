@@ -0,0 +1,153 @@
+"""
+Bounded session logs that spill older entries to an append-only file per session
+"""
+import json
+import os
+import tempfile
+import threading
+import uuid
+from collections import deque
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SESSION_LOG_DIR = os.getenv("SESSION_LOG_DIR", os.path.join(PROJECT_ROOT, ".sessions", "logs"))
+SESSION_LOG_MAX_ENTRIES = int(os.getenv("SESSION_LOG_MAX_ENTRIES", "200"))
+
+def session_log_path(uid: int, kind: str) -> str:
+    """New segment file for the spilled entries of one log, unique to this session of the user"""
+    return os.path.join(SESSION_LOG_DIR, str(uid), f"{kind}-{uuid.uuid4().hex}.jsonl")
+
+class SessionLog:
+    """Ring buffer of recent log entries; older entries are spilled to disk
+
+    Memory stays between max_entries / 2 and max_entries entries no matter how
+    long the session runs. len() and indexing cover every entry (spilled ones
+    are read back from the segment file), iterating yields the in-memory ones
+    and iter_all() lazily replays the full history.
+    """
+
+    def __init__(self, entries: Iterable[Any] = (), max_entries: int = None, spill_path: str = None,
+                 spilled: int = 0):
+        self.max_entries = max(2, max_entries or SESSION_LOG_MAX_ENTRIES)
+        self.spill_path = spill_path
+        self.spilled = spilled
+        self._recent: deque = deque()
+        self._lock = threading.Lock()
+        for entry in entries:
+            self.append(entry)
+
+    def bind(self, spill_path: str):
+        """Set the segment file, unless entries were already spilled elsewhere"""
+        with self._lock:
+            if not self.spilled:
+                self.spill_path = spill_path
+
+    def append(self, entry: Any):
+        """Append an entry, spilling the oldest half once the buffer is full"""
+        with self._lock:
+            self._recent.append(entry)
+            if len(self._recent) > self.max_entries:
+                self._spill(len(self._recent) - self.max_entries // 2)
+
+    def _spill(self, count: int):
+        """Write the oldest entries to the segment file (caller holds the lock)"""
+        if self.spill_path is None:
+            handle, self.spill_path = tempfile.mkstemp(prefix="session_log_", suffix=".jsonl")
+            os.close(handle)
+
+        lines = [json.dumps(self._recent.popleft()) + "\n" for _ in range(count)]
+        os.makedirs(os.path.dirname(self.spill_path), exist_ok=True)
+        with open(self.spill_path, "a", encoding="utf-8") as segment:
+            segment.writelines(lines)
+        self.spilled += count
+
+    def iter_all(self) -> Iterator[Any]:
+        """Lazily yield the full history, spilled entries first"""
+        with self._lock:
+            recent = list(self._recent)
+            spill_path = self.spill_path if self.spilled else None
+            spilled = self.spilled
+
+        # Only the entries this log spilled, so the history always agrees with len()
+        if spill_path and os.path.exists(spill_path):
+            with open(spill_path, encoding="utf-8") as segment:
+                for line in islice(segment, spilled):
+                    yield json.loads(line)
+        yield from recent
+
+    def clear(self):
+        """Drop every entry and remove the segment file, e.g. when the session is deleted"""
+        with self._lock:
+            if self.spilled and self.spill_path and os.path.exists(self.spill_path):
+                os.remove(self.spill_path)
+            self._recent.clear()
+            self.spilled = 0
+
+    def recent(self, count: int = None) -> List[Any]:
+        """Get the newest in-memory entries, oldest first"""
+        with self._lock:
+            entries = list(self._recent)
+        return entries if count is None else entries[-count:]
+
+    def __len__(self) -> int:
+        return self.spilled + len(self._recent)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.recent())
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return list(self.iter_all())[index]
+
+        with self._lock:
+            spilled = self.spilled
+            total = spilled + len(self._recent)
+            position = index + total if index < 0 else index
+            if not 0 <= position < total:
+                raise IndexError("session log index out of range")
+            if position >= spilled:
+                return self._recent[position - spilled]
+            spill_path = self.spill_path
+
+        with open(spill_path, encoding="utf-8") as segment:
+            return json.loads(next(islice(segment, position, None)))
+
+    def __repr__(self) -> str:
+        return f"SessionLog(recent={len(self._recent)}, spilled={self.spilled})"
+
+    def to_state(self) -> Dict[str, Any]:
+        """Serializable state: recent entries plus where the rest lives"""
+        with self._lock:
+            return {
+                "recent": list(self._recent),
+                "spilled": self.spilled,
+                "spill_path": self.spill_path
+            }
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.to_state()
+        state["max_entries"] = self.max_entries
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__init__(state["recent"], max_entries=state["max_entries"], spill_path=state["spill_path"],
+                      spilled=state["spilled"])
+
+    @classmethod
+    def from_value(cls, value: Any) -> "SessionLog":
+        """Build a log from a SessionLog, a to_state() dict or a plain list"""
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, dict):
+            return cls(value.get("recent", ()), spill_path=value.get("spill_path"),
+                       spilled=value.get("spilled", 0))
+        return cls(value)
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source_type, handler):
+        from pydantic_core import core_schema
+        return core_schema.no_info_plain_validator_function(
+            cls.from_value,
+            serialization=core_schema.plain_serializer_function_ser_schema(lambda log: log.to_state())
+        )
@@ -0,0 +1,128 @@
+"""
+Startup budget report: per-module import time and first-request latency
+
+Run from the project directory:
+
+    python -m utils.startup_report [--top 25]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+# One message per routing branch; each first use loads its tool or agent
+SAMPLE_MESSAGES = [
+    ("goal", "I want to lose 5kg in 2 months"),
+    ("meal", "I need a vegetarian meal plan"),
+    ("workout", "I need a workout plan"),
+    ("progress", "Track my progress: I weigh 70kg"),
+    ("schedule", "Schedule daily check-ins"),
+    ("general", "What can you do?"),
+    ("escalation", "I want to talk to a human coach"),
+    ("nutrition", "I have diabetes"),
+    ("injury", "I have knee pain")
+]
+
+RESULT_MARKER = "STARTUP_REPORT_RESULT "
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_PACKAGES = ("agent", "context", "guardrails", "hooks", "response_schemas", "session_manager",
+                    "session_repository", "tools", "agents", "utils", "nutrition", "fitness")
+
+def measure_first_requests() -> Dict[str, Any]:
+    """Time agent construction and the first request on each routing branch"""
+    import time
+
+    timings = {}
+    components = {}
+    start = time.perf_counter()
+    from agent import HealthWellnessAgent
+    from context import UserSessionContext, RunContextWrapper
+    timings["import agent"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    agent = HealthWellnessAgent()
+    context = RunContextWrapper(UserSessionContext(uid=0))
+    timings["construct agent"] = time.perf_counter() - start
+
+    for label, message in SAMPLE_MESSAGES:
+        start = time.perf_counter()
+        agent.process_message(message, context)
+        first = time.perf_counter() - start
+
+        start = time.perf_counter()
+        agent.process_message(message, context)
+        warm = time.perf_counter() - start
+        timings[f"first {label}"] = first
+        timings[f"warm {label}"] = warm
+
+    # Per-component load time: the lazy import plus constructing the tool or agent,
+    # which -X importtime (per-module import cost only) does not cover
+    from utils.components import tool_registry, agent_registry
+    for registry in (tool_registry, agent_registry):
+        components.update(registry.load_times)
+
+    return {"timings": timings, "components": components}
+
+def parse_import_times(stderr: str) -> List[Dict[str, Any]]:
+    """Parse `python -X importtime` output into rows"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000
+        })
+    return rows
+
+def run_report(top: int = 25) -> str:
+    """Measure in a fresh interpreter and format the report"""
+    code = (
+        "import json\n"
+        "from utils.startup_report import measure_first_requests, RESULT_MARKER\n"
+        "print(RESULT_MARKER + json.dumps(measure_first_requests()))\n"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    result_line = next(line for line in completed.stdout.splitlines() if line.startswith(RESULT_MARKER))
+    result = json.loads(result_line[len(RESULT_MARKER):])
+    timings = result["timings"]
+    imports = parse_import_times(completed.stderr)
+
+    project = [row for row in imports if row["module"].split(".")[0] in PROJECT_PACKAGES]
+    heaviest = sorted((row for row in imports if row["depth"] <= 1), key=lambda row: row["cumulative_ms"], reverse=True)
+
+    lines = ["Project modules (import order)", f"  {'module':<40} {'self ms':>10} {'cumulative ms':>14}"]
+    for row in project:
+        lines.append(f"  {row['module']:<40} {row['self_ms']:>10.2f} {row['cumulative_ms']:>14.2f}")
+
+    lines += ["", "Lazy components (import + construct on first use)", f"  {'component':<40} {'ms':>10}"]
+    for name, seconds in result["components"].items():
+        lines.append(f"  {name:<40} {seconds * 1000:>10.2f}")
+
+    lines += ["", f"Heaviest top-level imports (top {top})", f"  {'module':<40} {'self ms':>10} {'cumulative ms':>14}"]
+    for row in heaviest[:top]:
+        lines.append(f"  {row['module']:<40} {row['self_ms']:>10.2f} {row['cumulative_ms']:>14.2f}")
+
+    lines += ["", "Startup and first-request latency", f"  {'step':<40} {'ms':>10}"]
+    for step, seconds in timings.items():
+        lines.append(f"  {step:<40} {seconds * 1000:>10.2f}")
+
+    return "\n".join(lines)
+
+def main():
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Report import time and first-request latency")
+    parser.add_argument("--top", type=int, default=25, help="number of heavy imports to list")
+    args = parser.parse_args()
+    print(run_report(args.top))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Process-wide registry of frozen template data for tools and specialist agents
+"""
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List
+from utils.frozen import deep_freeze
+
+DEFAULT_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "templates")
+
+class TemplateRegistry:
+    """Loads every JSON file in the template directory once and shares it frozen"""
+
+    def __init__(self, template_dir: str = None):
+        self.template_dir = template_dir or os.getenv("TEMPLATE_DIR", DEFAULT_TEMPLATE_DIR)
+        self._templates: Dict[str, Any] = None
+        self._listeners: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Any:
+        """Get a frozen template by file name (without extension)"""
+        templates = self._templates
+        if templates is None:
+            templates = self._ensure_loaded()
+        return templates[name]
+
+    def reload(self):
+        """Re-read the template files and notify listeners"""
+        templates = self._read_all()
+        with self._lock:
+            self._templates = templates
+        for listener in list(self._listeners):
+            listener()
+
+    def on_reload(self, listener: Callable[[], None]):
+        """Register a callback run after every reload, e.g. a cache invalidation"""
+        self._listeners.append(listener)
+
+    def _ensure_loaded(self) -> Dict[str, Any]:
+        """Load the templates on first access"""
+        with self._lock:
+            if self._templates is None:
+                self._templates = self._read_all()
+            return self._templates
+
+    def _read_all(self) -> Dict[str, Any]:
+        """Read and freeze every template file"""
+        templates = {}
+        for file_name in sorted(os.listdir(self.template_dir)):
+            name, extension = os.path.splitext(file_name)
+            if extension != ".json":
+                continue
+            with open(os.path.join(self.template_dir, file_name), encoding="utf-8") as handle:
+                templates[name] = deep_freeze(json.load(handle))
+        return templates
+
+# Global template registry
+template_registry = TemplateRegistry()
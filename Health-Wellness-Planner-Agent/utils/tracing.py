@@ -0,0 +1,147 @@
+"""
+Lightweight nested span tracing with Chrome trace-event export
+"""
+import contextvars
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+# Innermost open span of the current thread / asyncio task
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+class Span:
+    """One timed operation; parent_id links it into the request's tree"""
+
+    __slots__ = ("name", "span_id", "parent_id", "trace_id", "start_ns", "end_ns", "thread_id", "attributes",
+                 "_tracer", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: Dict[str, Any]):
+        parent = _current_span.get()
+        self.name = name
+        self.span_id = next(tracer._ids)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+        self.attributes = attributes
+        self.start_ns = 0
+        self.end_ns = 0
+        self.thread_id = 0
+        self._tracer = tracer
+        self._token = None
+
+    def set(self, **attributes: Any):
+        """Attach attributes, e.g. the routed intent"""
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        self.thread_id = threading.get_ident()
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.perf_counter_ns()
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self._tracer._finished.append(self)
+        return False
+
+    @property
+    def duration_ns(self) -> int:
+        return self.end_ns - self.start_ns
+
+class _NoopSpan:
+    """Shared stand-in returned while tracing is disabled"""
+
+    def set(self, **attributes: Any):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NOOP_SPAN = _NoopSpan()
+
+class Tracer:
+    """Records finished spans into a bounded buffer
+
+    Disabled by default (TRACING=1 enables it); while disabled span() returns
+    a shared no-op object and traced() functions call straight through.
+    Context propagates to asyncio tasks and asyncio.to_thread automatically;
+    thread pools need their submissions wrapped with contextvars.copy_context().
+    """
+
+    def __init__(self, enabled: bool = False, max_spans: int = 10000):
+        self.enabled = enabled
+        self._finished: deque = deque(maxlen=max_spans)
+        self._ids = itertools.count(1)
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def span(self, name: str, **attributes: Any):
+        """Context manager timing a block as a child of the current span"""
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, attributes)
+
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def spans(self) -> List[Span]:
+        """Finished spans, in completion order"""
+        return list(self._finished)
+
+    def clear(self):
+        self._finished.clear()
+
+    def export_chrome_trace(self, path: str = None) -> Dict[str, Any]:
+        """Finished spans as Chrome trace-event JSON (chrome://tracing, Perfetto)"""
+        pid = os.getpid()
+        events = []
+        for span in self.spans():
+            args = {"span_id": span.span_id, "parent_id": span.parent_id, "trace_id": span.trace_id}
+            args.update(span.attributes)
+            events.append({
+                "name": span.name,
+                "cat": span.name.split(".")[0],
+                "ph": "X",
+                "ts": span.start_ns / 1000,
+                "dur": span.duration_ns / 1000,
+                "pid": pid,
+                "tid": span.thread_id,
+                "args": args
+            })
+        events.sort(key=lambda event: event["ts"])
+        trace = {"traceEvents": events, "displayTimeUnit": "ns"}
+        if path:
+            with open(path, "w", encoding="utf-8") as output:
+                json.dump(trace, output, default=str)
+        return trace
+
+def traced(name: str = None) -> Callable:
+    """Decorator recording each call as a span named after the function"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with Span(tracer, span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# Global tracer
+tracer = Tracer(enabled=os.getenv("TRACING") == "1", max_spans=int(os.getenv("TRACE_BUFFER", "10000")))